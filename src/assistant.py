@@ -3,55 +3,231 @@ Google Assistant Integration Module
 This module provides functionality to interact with the Google Assistant API.
 """
 
+import functools
 import logging
 import re
-from typing import Any, Dict
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
 from google.oauth2.credentials import Credentials  # pylint: disable=import-error
 from gassist_text import TextAssistant  # type: ignore  # pylint: disable=import-error
 
+from src.corpus import CorpusRecorder
+
 OAUTH2_TOKEN_PATH = "token.json"
 DEFAULT_LANGUAGE = "en-US"
+DEFAULT_IDLE_TIMEOUT = 3600
 
 logger = logging.getLogger(__name__)
 
 
 # pylint: disable=R0903
+class AssistantResponse:
+    """A response of the Google Assistant to a command."""
+
+    __slots__ = ("command", "lang", "raw", "text", "latency")
+
+    command: str
+    lang: str
+    raw: Any
+    text: str
+    latency: float
+
+    def __init__(
+        self, command: str, lang: str, raw: Any, text: str, latency: float
+    ) -> None:
+        self.command = command
+        self.lang = lang
+        self.raw = raw
+        self.text = text
+        self.latency = latency
+
+
+class LanguageStats:
+    """Call and latency statistics of the Text Assistant of one language."""
+
+    __slots__ = ("calls", "errors", "total_latency", "max_latency", "last_used")
+
+    calls: int
+    errors: int
+    total_latency: float
+    max_latency: float
+    last_used: float
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_used = time.monotonic()
+
+    def record(self, latency: float, error: bool = False) -> None:
+        """Record a call to the Text Assistant."""
+        self.calls += 1
+        self.errors += int(error)
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.last_used = time.monotonic()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the statistics as a dictionary."""
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_latency": (
+                round(self.total_latency / self.calls, 3) if self.calls else None
+            ),
+            "max_latency": round(self.max_latency, 3),
+        }
+
+
+# pylint: disable=R0902,R0903
 class GoogleAssistant:
     """Encapsulates the Google Assistant API logic."""
 
-    creds: Credentials
+    text_assistant_factory: Callable[[str], TextAssistant]
     lang: str
-    text_assistant: TextAssistant
+    idle_timeout: float
+    text_assistants: Dict[str, TextAssistant]
+    stats: Dict[str, LanguageStats]
+    recorder: Optional[CorpusRecorder]
+    _lock: threading.Lock
 
-    def __init__(self, server_config: Dict[str, Any]) -> None:
-        """Initialize the Google Assistant."""
-        self.creds = Credentials.from_authorized_user_file(OAUTH2_TOKEN_PATH)
+    def __init__(
+        self,
+        server_config: Dict[str, Any],
+        text_assistant_factory: Optional[Callable[[str], TextAssistant]] = None,
+    ) -> None:
+        """Initialize the Google Assistant. Text Assistants are created with the
+        stored credentials unless a factory taking the language is given."""
+        if text_assistant_factory is None:
+            creds = Credentials.from_authorized_user_file(OAUTH2_TOKEN_PATH)
+            text_assistant_factory = functools.partial(
+                TextAssistant, creds, display=True
+            )
+        self.text_assistant_factory = text_assistant_factory
         self.lang = server_config.get("GOOGLE_API_LANGUAGE", DEFAULT_LANGUAGE)
-        self._init_text_assistant()
+        self.idle_timeout = server_config.get(
+            "ASSISTANT_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT
+        )
+        record_path = server_config.get("ASSISTANT_RECORD_PATH")
+        self.recorder = CorpusRecorder(record_path) if record_path else None
+        self.text_assistants = {}
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._init_text_assistant(self.lang)
+
+    def _init_text_assistant(self, lang: str) -> TextAssistant:
+        """Initialize the Text Assistant of the language."""
+        logger.info("Creating Text Assistant for language: %s", lang)
+        text_assistant = self.text_assistant_factory(lang)
+        self.text_assistants[lang] = text_assistant
+        self.stats.setdefault(lang, LanguageStats())
+        return text_assistant
+
+    @staticmethod
+    def _close_text_assistant(text_assistant: TextAssistant) -> None:
+        """Close the channel of a Text Assistant that is no longer used."""
+        try:
+            text_assistant.close()
+        # pylint: disable=broad-except
+        except Exception as e:
+            logger.debug("Error while closing Text Assistant: %s", e)
+
+    def evict_idle(self) -> None:
+        """Close the Text Assistants of languages that were not used recently.
+        The default language is kept."""
+        now = time.monotonic()
+        idle = []
+        with self._lock:
+            for lang in list(self.text_assistants):
+                if (
+                    lang != self.lang
+                    and now - self.stats[lang].last_used > self.idle_timeout
+                ):
+                    logger.info("Closing idle Text Assistant for language: %s", lang)
+                    idle.append(self.text_assistants.pop(lang))
+        for text_assistant in idle:
+            self._close_text_assistant(text_assistant)
+
+    def _get_text_assistant(self, lang: str) -> TextAssistant:
+        """Return the Text Assistant of the language, creating it if necessary."""
+        self.evict_idle()
+        with self._lock:
+            text_assistant = self.text_assistants.get(lang)
+            if text_assistant is None:
+                text_assistant = self._init_text_assistant(lang)
+            self.stats[lang].last_used = time.monotonic()
+            return text_assistant
 
-    def _init_text_assistant(self) -> None:
-        """Initialize the Text Assistant with the current credentials and language."""
-        self.text_assistant = TextAssistant(self.creds, self.lang, display=True)
+    def _reset_text_assistant(self, lang: str) -> None:
+        """Drop the Text Assistant of the language so it is re-created on the
+        next call."""
+        with self._lock:
+            text_assistant = self.text_assistants.pop(lang, None)
+        if text_assistant is not None:
+            self._close_text_assistant(text_assistant)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return the call and latency statistics per language."""
+        with self._lock:
+            return {lang: stats.as_dict() for lang, stats in self.stats.items()}
 
     def _extract_response(self, response: str) -> str:
         """Extract the relevant part of the response from the Google Assistant."""
         match = re.search(r'<div class="show_text_content">(.*?)</div>', response)
         return match.group(1) if match else "No valid response found."
 
-    def call_assistant(self, command: str) -> str:
-        """Send a command to the Google Assistant and process the response."""
-        logger.info("Sending command to Google Assistant: %s", command)
+    def assist(self, command: str, lang: Optional[str] = None) -> AssistantResponse:
+        """Send a command to the Google Assistant in the given language (the
+        default language if None) and extract the text of the response."""
+        lang = lang or self.lang
+        logger.info("Sending command to Google Assistant (%s): %s", lang, command)
 
+        started = time.monotonic()
         try:
-            response = self.text_assistant.assist(command)
-            if isinstance(response, tuple):
-                response = response[1]
-            if isinstance(response, bytes):
-                response = response.decode("utf-8")
-            if isinstance(response, str):
-                response = self._extract_response(response)
-            return response
+            raw_response = self._get_text_assistant(lang).assist(command)
         except Exception as e:
             logger.error("Error while sending command to Google Assistant: %s", e)
-            self._init_text_assistant()
+            with self._lock:
+                self.stats.setdefault(lang, LanguageStats()).record(
+                    time.monotonic() - started, error=True
+                )
+            self._reset_text_assistant(lang)
             raise RuntimeError("Assistant error. Re-init Text Assistant") from e
+        latency = time.monotonic() - started
+        with self._lock:
+            self.stats[lang].record(latency)
+
+        response = raw_response
+        if isinstance(response, tuple):
+            response = response[1]
+        if isinstance(response, bytes):
+            response = response.decode("utf-8")
+        if isinstance(response, str):
+            response = self._extract_response(response)
+        return AssistantResponse(command, lang, raw_response, response, latency)
+
+    def record(self, response: AssistantResponse, **expected: Any) -> None:
+        """Record the response to the corpus, if recording is enabled, together
+        with its extracted text and the given expected results."""
+        if self.recorder is None:
+            return
+        try:
+            self.recorder.record(
+                response.command,
+                response.lang,
+                response.raw,
+                response.latency,
+                {"extracted": response.text, **expected},
+            )
+        # pylint: disable=broad-except
+        except Exception as e:
+            logger.error("Error recording response to %s: %s", response.command, e)
+
+    def call_assistant(self, command: str, lang: Optional[str] = None) -> str:
+        """Send a command to the Google Assistant, record the response and
+        return its extracted text."""
+        response = self.assist(command, lang)
+        self.record(response)
+        return response.text
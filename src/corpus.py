@@ -0,0 +1,60 @@
+"""
+This module records raw Google Assistant responses to an on-disk corpus.
+"""
+
+import gzip
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+# pylint: disable=R0903
+class CorpusRecorder:
+    """Appends raw Assistant responses to a gzip-compressed JSON lines file."""
+
+    path: str
+    _lock: threading.Lock
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        command: str,
+        lang: str,
+        response: Any,
+        latency: float,
+        expected: Dict[str, Any],
+    ) -> None:
+        """Record a raw response as returned by TextAssistant.assist, together
+        with the expected results of processing it, e.g. the extracted text."""
+        text, html = None, response
+        if isinstance(response, tuple):
+            text, html = response[0], response[1]
+        if isinstance(html, bytes):
+            html = html.decode("utf-8")
+        entry = {
+            "command": command,
+            "lang": lang,
+            "text": text,
+            "html": html,
+            "latency": round(latency, 3),
+            "timestamp": time.time(),
+            **expected,
+        }
+        try:
+            with self._lock, gzip.open(self.path, "at", encoding="utf-8") as corpus:
+                corpus.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        except OSError as e:
+            logger.error("Error recording response to %s: %s", self.path, e)
+
+
+def load_corpus(path: str) -> List[Dict[str, Any]]:
+    """Load all recorded entries from a corpus file."""
+    with gzip.open(path, "rt", encoding="utf-8") as corpus:
+        return [json.loads(line) for line in corpus if line.strip()]
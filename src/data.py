@@ -3,79 +3,171 @@ This module handles the data update process for the Google Assistant integration
 """
 
 import logging
-import datetime
 import time
 import re
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Set
 
 from src.assistant import GoogleAssistant
+from src.quota import CallQuota, POLL
+from src.schedule import Schedule, next_active
+from src.state import DeviceState
+
+DEFAULT_RELOAD_INTERVAL = 300
 
 logger = logging.getLogger(__name__)
 
 
-# pylint: disable=R0903
+# pylint: disable=R0902,R0903
 class DataUpdater:
     """Handles the data update process for the Google Assistant integration."""
 
     assistant: GoogleAssistant
     mqtt_config: Dict[str, Any]
-    data_cache: Dict[str, Any]
+    reload_interval: float
+    quota: CallQuota
+    state: DeviceState
+    next_update: Dict[str, float]
+    schedules: Dict[str, Optional[Schedule]]
+    _never_polled: Set[str]
 
-    def __init__(self, assistant: GoogleAssistant, mqtt_config: Dict[str, Any]) -> None:
+    def __init__(
+        self,
+        assistant: GoogleAssistant,
+        mqtt_config: Dict[str, Any],
+        reload_interval: float = DEFAULT_RELOAD_INTERVAL,
+        quota: Optional[CallQuota] = None,
+    ) -> None:
         self.assistant = assistant
         self.mqtt_config = mqtt_config
-        self.data_cache = {
-            "timestamp": 0,
-            "error": None,
-            "sdk_calls_today": 0,
-            "sdk_calls_today_date": None,
+        self.reload_interval = reload_interval
+        self.quota = quota or CallQuota()
+        self.next_update = {}
+        self.schedules = {
+            key: Schedule.from_config(value)
+            for key, value in mqtt_config.get("publish", {}).items()
         }
+        self.state = DeviceState()
+        self._never_polled = set()
 
-    def update_data(self) -> Dict[str, Any]:
-        """Update the status cache by querying the Google Assistant
-        and publishing the results to MQTT."""
-        logger.info("Starting data update...")
-        try:
-            counter = 0
-            for key, value in self.mqtt_config.get("publish", {}).items():
-                logger.debug("Processing key: %s, value: %s", key, value)
-                command = value["command"]
-                regex_str = value.get("regex", "(.*)")
-                result_map = value.get("result_map", {})
-                answer = self.assistant.call_assistant(command)
-                regex = re.compile(regex_str)
-                if answer is not None:
-                    match = re.search(regex, answer)
-                    counter += 1
-                    if match:
-                        result = match.group(1)
-                    else:
-                        result = "No valid response found."
-                else:
-                    result = "No answer received."
-                if result in result_map:
-                    self.data_cache[key] = result_map[result]
-                else:
-                    self.data_cache[key] = result
-                logger.info("Received data for key %s: %s", key, self.data_cache[key])
-
-            self.data_cache["timestamp"] = time.time()
-            self.data_cache["error"] = ""
-
-            today = datetime.date.today().isoformat()
-            if self.data_cache.get("sdk_calls_today_date") != today:
-                self.data_cache["sdk_calls_today"] = counter
-                self.data_cache["sdk_calls_today_date"] = today
-            else:
-                self.data_cache["sdk_calls_today"] += counter
+    @staticmethod
+    def parse_answer(value: Dict[str, Any], answer: Optional[str]) -> Any:
+        """Extract the value of a publish entry from the assistant's answer
+        using its regex and result map."""
+        if answer is not None:
+            match = re.search(value.get("regex", "(.*)"), answer)
+            result = match.group(1) if match else "No valid response found."
+        else:
+            result = "No answer received."
+        return value.get("result_map", {}).get(result, result)
 
-            logger.info("Data update completed successfully.")
+    def _rule(self, key: str) -> Dict[str, Any]:
+        """Return the rule matching the last value of the key, if any."""
+        value = self.state.get_value(key)
+        if value is None:
+            return {}
+        rules = self.mqtt_config["publish"][key].get("rules", {})
+        return rules.get(str(value), {})
+
+    def get_interval(self, key: str) -> float:
+        """Return the polling interval of the key based on its last value."""
+        value = self.mqtt_config["publish"][key]
+        interval = value.get("interval", self.reload_interval)
+        return float(self._rule(key).get("interval", interval))
+
+    def is_active(self, key: str) -> bool:
+        """Check if the key is not disabled by the rule of another key and the
+        other keys it is only polled with have one of the required values."""
+        poll_when = self.mqtt_config["publish"][key].get("poll_when", {})
+        for other, values in poll_when.items():
+            value = self.state.get_value(other)
+            if value is None or str(value) not in values:
+                return False
+        return not any(
+            key in self._rule(other).get("disable", [])
+            for other in self.mqtt_config.get("publish", {})
+        )
+
+    def _is_due(self, key: str, now: float) -> bool:
+        """Check if the key is active and its polling interval has elapsed."""
+        if self.next_update.get(key, 0) > now:
+            return False
+        schedule = self.schedules.get(key)
+        if schedule is not None and not schedule.is_active(now):
+            logger.debug("Skipping key outside of its active windows: %s", key)
+            return False
+        if not self.is_active(key):
+            logger.debug("Skipping disabled key: %s", key)
+            return False
+        return True
+
+    def _update_call_count(self) -> None:
+        """Copy the calls made today by polling and commands into the state."""
+        self.state.set_call_count(self.quota.calls_today, self.quota.date)
+
+    def seconds_until_next_update(self, pause: Optional[Schedule] = None) -> float:
+        """Return the number of seconds until the next active key is due and
+        within its active windows and the optional global schedule. If the
+        polling quota is used up, no key is due before the quota is reset."""
+        now = time.time()
+        earliest = now if self.quota.has_capacity(POLL) else self.quota.next_reset()
+        due = []
+        for key in self.mqtt_config.get("publish", {}):
+            if not self.is_active(key):
+                continue
+            try:
+                due.append(
+                    next_active(
+                        (self.schedules.get(key), pause),
+                        max(self.next_update.get(key, 0), earliest),
+                    )
+                )
+            except ValueError as e:
+                if key not in self._never_polled:
+                    logger.warning("Key %s is never polled: %s", key, e)
+                    self._never_polled.add(key)
+        return max(min(due, default=now + self.reload_interval) - now, 0)
+
+    def _update_key(self, key: str, value: Dict[str, Any], now: float) -> Optional[str]:
+        """Query the Google Assistant for a single key. On an error only this key
+        is cleared and retried after the default reload interval. Returns the
+        error message, or None on success."""
+        logger.debug("Processing key: %s, value: %s", key, value)
+        try:
+            response = self.assistant.assist(value["command"], value.get("language"))
+            result = self.parse_answer(value, response.text)
         # pylint: disable=broad-except
         except Exception as e:
-            logger.error("Error updating status cache: %s", e)
-            self.data_cache["error"] = re.sub(r"[\n\t]", "", str(e))
-            self.data_cache["timestamp"] = time.time()
-            for key in self.mqtt_config.get("publish", {}).keys():
-                self.data_cache[key] = None
+            logger.error("Error updating key %s: %s", key, e)
+            error = re.sub(r"[\n\t]", "", str(e))
+            self.state.set_value(key, None, time.time(), error)
+            self.next_update[key] = now + self.reload_interval
+            return error
+        self.assistant.record(response, value=result)
+        self.state.set_value(key, result, time.time())
+        self.next_update[key] = now + self.get_interval(key)
+        logger.info("Received data for key %s: %s", key, self.state.get_value(key))
+        return None
+
+    def update_data(self) -> DeviceState:
+        """Update the status cache by querying the Google Assistant for all
+        active keys that are due."""
+        logger.info("Starting data update...")
+        now = time.time()
+        errors = []
+        for key, value in self.mqtt_config.get("publish", {}).items():
+            if not self._is_due(key, now):
+                continue
+            if not self.quota.try_acquire(POLL):
+                # The due keys are polled once the quota is reset
+                break
+            error = self._update_key(key, value, now)
+            if error is not None:
+                errors.append(error)
+
+        self.state.timestamp = time.time()
+        self.state.error = "; ".join(errors)
+        self._update_call_count()
+        if not errors:
+            logger.info("Data update completed successfully.")
 
-        return self.data_cache
+        return self.state
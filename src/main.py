@@ -5,14 +5,17 @@ Main entry point for the application.
 import logging
 import threading
 import time
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from src.config import Config
 from src.mqtt import MQTTClient
 from src.assistant import GoogleAssistant
 from src.data import DataUpdater
+from src.quota import CallQuota
+from src.schedule import Schedule
 
 DEFAULT_GOOGLE_API_RELOAD_INTERVAL = 300
+MIN_UPDATE_DELAY = 1
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,7 +26,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-# pylint: disable=R0903
+# pylint: disable=R0902,R0903
 class MainApplication:
     """Main application class for Google Assistant MQTT Connect."""
 
@@ -31,8 +34,10 @@ class MainApplication:
     server_config: Dict[str, Any]
     mqtt_config: Dict[str, Any]
     assistant: GoogleAssistant
+    quota: CallQuota
     data_updater: DataUpdater
     mqtt_client: MQTTClient
+    pause_schedule: Optional[Schedule]
 
     def __init__(self) -> None:
         """Initialize the application and its dependencies."""
@@ -40,42 +45,66 @@ class MainApplication:
         self.server_config = self.config.get_server_config()
         self.mqtt_config = self.config.get_mqtt_config()
         self.assistant = GoogleAssistant(self.server_config)
-        self.data_updater = DataUpdater(self.assistant, self.mqtt_config)
+        self.quota = CallQuota(self.server_config)
+        self.data_updater = DataUpdater(
+            self.assistant, self.mqtt_config, self._get_reload_interval(), self.quota
+        )
         self.mqtt_client = MQTTClient(
-            self.assistant, self.server_config, self.mqtt_config
+            self.assistant,
+            self.server_config,
+            self.mqtt_config,
+            self.quota,
+            self.data_updater.state,
+        )
+        self.pause_schedule = Schedule.from_pause_hours(
+            self.server_config.get("REQUEST_PAUSE_HOURS", [])
+        )
+
+    def _get_reload_interval(self) -> float:
+        """Return the configured default polling interval."""
+        return self.server_config.get(
+            "GOOGLE_API_RELOAD_INTERVAL", DEFAULT_GOOGLE_API_RELOAD_INTERVAL
         )
 
+    def get_update_delay(self) -> float:
+        """Return the number of seconds to sleep until the next key is due,
+        skipping the request pause hours and the keys' quiet windows."""
+        delay = self.data_updater.seconds_until_next_update(self.pause_schedule)
+        return max(delay, MIN_UPDATE_DELAY)
+
     def _update_loop(self) -> None:
         """Periodically update the status cache by querying the Google Assistant."""
         while True:
             self.update_and_publish_data()
-            time.sleep(
-                self.server_config.get(
-                    "GOOGLE_API_RELOAD_INTERVAL", DEFAULT_GOOGLE_API_RELOAD_INTERVAL
-                )
-            )
+            time.sleep(self.get_update_delay())
 
     def update_and_publish_data(self) -> None:
         """Update the data and publish it to MQTT."""
         request_pause = self.server_config.get("REQUEST_PAUSE_HOURS", [])
-        current_hour = time.localtime().tm_hour
         # Check if we've actually fetched data before
-        is_first_run = self.data_updater.data_cache.get("sdk_calls_today") == 0
-        if current_hour not in request_pause or is_first_run:
+        is_first_run = self.data_updater.state.sdk_calls_today == 0
+        is_active = self.pause_schedule is None or self.pause_schedule.is_active(
+            time.time()
+        )
+        if is_active or is_first_run:
             data = self.data_updater.update_data()
         else:
             logger.info(
                 "Skipping data update during request pause hours: %s",
                 str(request_pause),
             )
-            data = self.data_updater.data_cache
+            data = self.data_updater.state
 
         self.mqtt_client.publish_to_mqtt(data)
+        self.assistant.evict_idle()
+        self.mqtt_client.publish_language_stats(self.assistant.get_stats())
 
     def run(self) -> None:
         """Run the main application loop."""
         # Start the update and publish thread
-        threading.Thread(target=self._update_loop, daemon=True).start()
+        threading.Thread(
+            target=self._update_loop, name="update-loop", daemon=True
+        ).start()
 
         try:
             while True:
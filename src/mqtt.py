@@ -3,22 +3,32 @@ This module provides functionality to interact with an MQTT broker.
 """
 
 import logging
-import datetime
 import json
-from typing import Any, Dict
+import time
+from typing import Any, Dict, Optional, Tuple
 import paho.mqtt.client as pahomqtt  # pylint: disable=import-error
 
 from src.assistant import GoogleAssistant
+from src.profiler import SamplingProfiler
+from src.quota import CallQuota, CommandRateLimiter, COMMAND
+from src.schedule import Schedule
+from src.state import DeviceState
 
 logger = logging.getLogger(__name__)
 
 
+# pylint: disable=R0902
 class MQTTClient:
     """Encapsulates the MQTT client logic."""
 
     assistant: GoogleAssistant
     server_config: Dict[str, Any]
     mqtt_config: Dict[str, Any]
+    profiler: SamplingProfiler
+    schedules: Dict[Tuple[str, str], Optional[Schedule]]
+    rate_limiter: CommandRateLimiter
+    quota: CallQuota
+    state: Optional[DeviceState]
     client: pahomqtt.Client
 
     def __init__(
@@ -26,10 +36,21 @@ class MQTTClient:
         assistant: GoogleAssistant,
         server_config: Dict[str, Any],
         mqtt_config: Dict[str, Any],
+        quota: Optional[CallQuota] = None,
+        state: Optional[DeviceState] = None,
     ) -> None:
         self.assistant = assistant
         self.server_config = server_config
         self.mqtt_config = mqtt_config
+        self.profiler = SamplingProfiler(server_config)
+        self.schedules = {
+            (subtopic, cmnd): Schedule.from_config(entry)
+            for subtopic, commands in mqtt_config.get("subscribe", {}).items()
+            for cmnd, entry in commands.items()
+        }
+        self.rate_limiter = CommandRateLimiter(server_config)
+        self.quota = quota or CallQuota(server_config)
+        self.state = state
         self.client = pahomqtt.Client(protocol=pahomqtt.MQTTv311)
 
         # Initialize the MQTT client during object creation
@@ -52,6 +73,8 @@ class MQTTClient:
         self.client.connect(server, port, 60)
         logger.info("Subscribing to topic: %s/cmnd/#", topic)
         self.client.subscribe(f"{topic}/cmnd/#")
+        logger.info("Subscribing to topic: %s/diag/profile", topic)
+        self.client.subscribe(f"{topic}/diag/profile")
         self.client.loop_start()
 
     def on_message(self, _client, _userdata, message) -> None:
@@ -62,6 +85,10 @@ class MQTTClient:
         subtopic = topic.split("/")[-1]  # e.g., "navimow_running"
         subscribed_commands = self.mqtt_config.get("subscribe", {})
 
+        if topic == f"{self.server_config['MQTT_TOPIC']}/diag/profile":
+            self.start_profile(cmnd)
+            return
+
         # Check if the subtopic is in the subscribed commands
         if subtopic not in subscribed_commands:
             logger.warning("Received message on unsubscribed topic: %s", subtopic)
@@ -72,34 +99,89 @@ class MQTTClient:
             logger.warning("Received command not in subscribed commands: %s", cmnd)
             return
 
-        # Get the command from the subscribed commands
+        # Check if the command is allowed now
+        reason = self._check_command(subtopic, cmnd)
+        if reason:
+            logger.warning("Rejected command %s/%s: %s", subtopic, cmnd, reason)
+            self.publish_rejection(subtopic, cmnd, reason)
+            return
+
+        # Get the command and its language from the subscribed commands
         command = subscribed_commands[subtopic].get(cmnd)
+        language = None
+        if isinstance(command, dict):
+            language = command.get("language")
+            command = command["command"]
         logger.info("Executing command: %s", command)
 
         try:
-            self.assistant.call_assistant(command)
+            self.assistant.call_assistant(command, language)
         except RuntimeError as e:
             logger.error("Error processing command: %s", e)
+        self.publish_call_count()
+
+    def _check_command(self, subtopic: str, cmnd: str) -> Optional[str]:
+        """Return the reason why the command is rejected, or None if allowed."""
+        schedule = self.schedules.get((subtopic, cmnd))
+        if schedule is not None and not schedule.is_active(time.time()):
+            return "outside of active windows"
+        # Check the quota first so a rejected command does not use up tokens
+        if not self.quota.has_capacity(COMMAND):
+            return "daily command quota used up"
+        if not self.rate_limiter.try_acquire(subtopic):
+            return "rate limit exceeded"
+        if not self.quota.try_acquire(COMMAND):
+            return "daily command quota used up"
+        return None
+
+    def publish_call_count(self) -> None:
+        """Copy the calls made today into the shared state and publish it, so
+        the count includes the commands made since the last data update."""
+        if self.state is None:
+            return
+        self.state.set_call_count(self.quota.calls_today, self.quota.date)
+        self.publish_to_mqtt(self.state)
+
+    def publish_rejection(self, subtopic: str, cmnd: str, reason: str) -> None:
+        """Publish the rejection of a command to the result topic."""
+        topic = self.server_config.get("MQTT_TOPIC")
+        payload = {"command": cmnd, "status": "rejected", "reason": reason}
+        try:
+            self.client.publish(f"{topic}/result/{subtopic}", json.dumps(payload))
+        except ValueError as e:
+            logger.error("Failed to publish to topic %s/result: %s", topic, e)
+
+    def publish_language_stats(self, stats: Dict[str, Any]) -> None:
+        """Publish the call and latency statistics per language."""
+        topic = self.server_config.get("MQTT_TOPIC")
+        try:
+            self.client.publish(f"{topic}/diag/languages", json.dumps(stats))
+        except ValueError as e:
+            logger.error("Failed to publish to topic %s/diag/languages: %s", topic, e)
 
-    @staticmethod
-    def format_date(timestamp: float) -> str:
-        """Format the timestamp as a string."""
-        return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+    def start_profile(self, payload: str) -> None:
+        """Start a profile of all threads and publish the summary when done."""
+        try:
+            duration = self.profiler.parse_duration(payload)
+        except ValueError as e:
+            logger.warning("Invalid profile request: %s", e)
+            return
+        if not self.profiler.start(duration, self.publish_profile):
+            logger.warning("Profile already running, ignoring request")
 
-    def publish_to_mqtt(self, data: Dict[str, Any]) -> None:
+    def publish_profile(self, summary: Dict[str, Any]) -> None:
+        """Publish the profile summary to the MQTT topic."""
+        topic = self.server_config.get("MQTT_TOPIC")
+        try:
+            self.client.publish(f"{topic}/diag/profile/result", json.dumps(summary))
+            logger.info("Published profile to topic: %s/diag/profile/result", topic)
+        except ValueError as e:
+            logger.error("Failed to publish profile to %s: %s", topic, e)
+
+    def publish_to_mqtt(self, data: DeviceState) -> None:
         """Publish the data to the MQTT topic."""
         topic = self.server_config.get("MQTT_TOPIC")
-        payload = {
-            "sdk_calls_today": int(data["sdk_calls_today"]),
-            "error": data["error"],
-            "timestamp": (
-                self.format_date(data["timestamp"]) if data["timestamp"] else None
-            ),
-        }
-        for key, _value in self.mqtt_config.get("publish", {}).items():
-            # check if the key is in the data
-            payload[key] = data.get(key)
-        payload_json = json.dumps(payload)
+        payload_json = data.to_json(list(self.mqtt_config.get("publish", {})))
         logger.info("Publishing payload to topic: %s/stat", topic)
         try:
             self.client.publish(f"{topic}/stat", payload_json)
@@ -0,0 +1,151 @@
+"""
+This module provides an on-demand sampling profiler for diagnosing CPU usage.
+"""
+
+import collections
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Counter, Dict, List, Optional
+
+DEFAULT_PROFILE_DURATION = 10.0
+DEFAULT_PROFILE_MAX_DURATION = 300.0
+DEFAULT_PROFILE_INTERVAL = 0.01
+DEFAULT_PROFILE_TOP_N = 10
+DEFAULT_PROFILE_OUTPUT_DIR = "profiles"
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """Periodically samples the stacks of all running threads."""
+
+    interval: float
+    max_duration: float
+    top_n: int
+    output_dir: str
+    _lock: threading.Lock
+    _running: bool
+
+    def __init__(self, server_config: Dict[str, Any]) -> None:
+        self.interval = float(
+            server_config.get("PROFILE_INTERVAL", DEFAULT_PROFILE_INTERVAL)
+        )
+        self.max_duration = float(
+            server_config.get("PROFILE_MAX_DURATION", DEFAULT_PROFILE_MAX_DURATION)
+        )
+        self.top_n = int(server_config.get("PROFILE_TOP_N", DEFAULT_PROFILE_TOP_N))
+        self.output_dir = server_config.get(
+            "PROFILE_OUTPUT_DIR", DEFAULT_PROFILE_OUTPUT_DIR
+        )
+        self._lock = threading.Lock()
+        self._running = False
+
+    def parse_duration(self, payload: str) -> float:
+        """Parse the requested duration in seconds, clamped to the maximum."""
+        payload = payload.strip()
+        duration = float(payload) if payload else DEFAULT_PROFILE_DURATION
+        if not math.isfinite(duration) or duration <= 0:
+            raise ValueError(f"Invalid profile duration: {payload}")
+        return min(duration, self.max_duration)
+
+    def start(
+        self, duration: float, callback: Callable[[Dict[str, Any]], None]
+    ) -> bool:
+        """Profile in a background thread and pass the summary to the callback.
+        Returns False if a profile is already running."""
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+
+        def _run() -> None:
+            try:
+                callback(self.profile(duration))
+            # pylint: disable=broad-except
+            except Exception as e:
+                logger.error("Error while profiling: %s", e)
+            finally:
+                with self._lock:
+                    self._running = False
+
+        threading.Thread(target=_run, name="profiler", daemon=True).start()
+        return True
+
+    @staticmethod
+    def _format_frame(frame: Any) -> str:
+        """Format a frame as 'function (file:line)'."""
+        code = frame.f_code
+        filename = os.path.basename(code.co_filename)
+        return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+    def _sample(self, stacks: Counter[str], own_ident: int) -> None:
+        """Record the current stack of every thread except the profiler itself."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        # pylint: disable=protected-access
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            frames: List[str] = []
+            current: Optional[Any] = frame
+            while current is not None:
+                frames.append(self._format_frame(current))
+                current = current.f_back
+            frames.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(frames))] += 1
+
+    def profile(self, duration: float) -> Dict[str, Any]:
+        """Sample all threads for the given duration and write a collapsed-stack
+        file. Returns a summary of the hottest functions."""
+        logger.info("Starting profile for %.1f seconds", duration)
+        stacks: Counter[str] = collections.Counter()
+        own_ident = threading.get_ident()
+        started = time.time()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            self._sample(stacks, own_ident)
+            time.sleep(self.interval)
+
+        path = self._write_collapsed(stacks, started)
+        summary = self.summarize(stacks)
+        summary["duration"] = round(time.time() - started, 3)
+        summary["file"] = path
+        logger.info("Profile written to %s", path)
+        return summary
+
+    def _write_collapsed(self, stacks: Counter[str], started: float) -> str:
+        """Write the stacks in collapsed format, as used by flamegraph tools."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(started))
+        path = os.path.join(self.output_dir, f"profile-{stamp}.collapsed")
+        with open(path, "w", encoding="utf-8") as profile_file:
+            for stack, count in stacks.most_common():
+                profile_file.write(f"{stack} {count}\n")
+        return path
+
+    def summarize(self, stacks: Counter[str]) -> Dict[str, Any]:
+        """Summarize the top-N functions by self samples per thread. The samples
+        are wall-clock, so a thread waiting in a sleep or select loop is kept
+        apart from a thread that is busy."""
+        leaves: Dict[str, Counter[str]] = collections.defaultdict(collections.Counter)
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            leaves[frames[0]][frames[-1]] += count
+        threads = {}
+        for thread, functions in leaves.items():
+            total = sum(functions.values())
+            threads[thread] = {
+                "samples": total,
+                "top": [
+                    {
+                        "function": function,
+                        "samples": count,
+                        "percent": round(100.0 * count / total, 1),
+                    }
+                    for function, count in functions.most_common(self.top_n)
+                ],
+            }
+        return {"samples": sum(stacks.values()), "threads": threads}
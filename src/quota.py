@@ -0,0 +1,155 @@
+"""
+This module provides rate limiting and daily quota accounting for the calls to
+the Google Assistant API.
+"""
+
+import datetime
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, Optional, Set
+
+DEFAULT_DAILY_LIMIT = 500
+DEFAULT_COMMAND_QUOTA_SHARE = 0.1
+DEFAULT_COMMAND_RATE = 6
+DEFAULT_COMMAND_BURST = 3
+DEFAULT_COMMAND_GLOBAL_RATE = 20
+DEFAULT_COMMAND_GLOBAL_BURST = 10
+
+POLL = "poll"
+COMMAND = "command"
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket refilled with a fixed number of tokens per minute."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    rate: float
+    capacity: float
+    tokens: float
+    updated: float
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate / 60
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        """Add the tokens accumulated since the last refill."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def has_token(self) -> bool:
+        """Check if a token is available."""
+        self.refill()
+        return self.tokens >= 1
+
+    def take(self) -> None:
+        """Consume a token."""
+        self.tokens -= 1
+
+
+# pylint: disable=R0903
+class CommandRateLimiter:
+    """Limits the rate of incoming commands per subtopic and globally."""
+
+    rate: float
+    burst: float
+    global_bucket: TokenBucket
+    buckets: Dict[str, TokenBucket]
+
+    def __init__(self, server_config: Dict[str, Any]) -> None:
+        self.rate = server_config.get("COMMAND_RATE", DEFAULT_COMMAND_RATE)
+        self.burst = server_config.get("COMMAND_BURST", DEFAULT_COMMAND_BURST)
+        self.global_bucket = TokenBucket(
+            server_config.get("COMMAND_GLOBAL_RATE", DEFAULT_COMMAND_GLOBAL_RATE),
+            server_config.get("COMMAND_GLOBAL_BURST", DEFAULT_COMMAND_GLOBAL_BURST),
+        )
+        self.buckets = {}
+
+    def try_acquire(self, subtopic: str) -> bool:
+        """Take a token from the subtopic and the global bucket if both have one."""
+        bucket = self.buckets.get(subtopic)
+        if bucket is None:
+            bucket = self.buckets[subtopic] = TokenBucket(self.rate, self.burst)
+        if not (bucket.has_token() and self.global_bucket.has_token()):
+            return False
+        bucket.take()
+        self.global_bucket.take()
+        return True
+
+
+class CallQuota:
+    """Counts the daily calls to the Google Assistant of polling and commands,
+    reserving a share of the daily limit for commands."""
+
+    limits: Dict[str, float]
+    calls: Dict[str, int]
+    date: Optional[str]
+    _exhausted: Set[str]
+    _lock: threading.Lock
+
+    def __init__(self, server_config: Optional[Dict[str, Any]] = None) -> None:
+        server_config = server_config or {}
+        daily_limit = server_config.get("GOOGLE_API_DAILY_LIMIT", DEFAULT_DAILY_LIMIT)
+        share = server_config.get("COMMAND_QUOTA_SHARE", DEFAULT_COMMAND_QUOTA_SHARE)
+        command_limit = int(daily_limit * share)
+        self.limits = {POLL: daily_limit - command_limit, COMMAND: command_limit}
+        self.calls = {POLL: 0, COMMAND: 0}
+        self.date = None
+        self._exhausted = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def unlimited(cls) -> "CallQuota":
+        """Create a quota that counts the calls without limiting them."""
+        quota = cls()
+        quota.limits = {POLL: math.inf, COMMAND: math.inf}
+        return quota
+
+    def _reset_if_new_day(self) -> None:
+        """Reset the counters at the start of a new day."""
+        today = datetime.date.today().isoformat()
+        if self.date != today:
+            self.calls = {POLL: 0, COMMAND: 0}
+            self._exhausted = set()
+            self.date = today
+
+    def has_capacity(self, kind: str) -> bool:
+        """Check if the share of the quota of the given kind allows a call."""
+        with self._lock:
+            self._reset_if_new_day()
+            return self.calls[kind] < self.limits[kind]
+
+    def try_acquire(self, kind: str) -> bool:
+        """Count a call of the given kind if its share of the quota allows it."""
+        with self._lock:
+            self._reset_if_new_day()
+            if self.calls[kind] >= self.limits[kind]:
+                if kind not in self._exhausted:
+                    logger.warning(
+                        "Daily %s quota of %d calls used up", kind, self.limits[kind]
+                    )
+                    self._exhausted.add(kind)
+                return False
+            self.calls[kind] += 1
+            return True
+
+    @staticmethod
+    def next_reset() -> float:
+        """Return the timestamp of the next reset of the counters."""
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        return datetime.datetime.combine(tomorrow, datetime.time()).timestamp()
+
+    @property
+    def calls_today(self) -> int:
+        """Return the number of calls made today."""
+        with self._lock:
+            self._reset_if_new_day()
+            return sum(self.calls.values())
@@ -0,0 +1,192 @@
+"""
+This module replays a recorded corpus offline to check and benchmark response
+extraction without spending Google Assistant quota.
+"""
+
+import argparse
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from src.assistant import GoogleAssistant, DEFAULT_LANGUAGE
+from src.config import MQTT_CONFIG_PATH
+from src.corpus import load_corpus
+from src.data import DataUpdater
+from src.quota import CallQuota
+
+MAX_MISMATCHES = 10
+# Fields of publish entries that would skip keys during the replay
+SCHEDULING_FIELDS = ("rules", "poll_when", "active", "timezone")
+
+logger = logging.getLogger(__name__)
+
+
+# pylint: disable=R0903
+class ReplayTextAssistant:
+    """Stand-in for TextAssistant that answers with recorded responses."""
+
+    responses: Dict[str, List[Dict[str, Any]]]
+    served: Dict[str, Dict[str, Any]]
+    _positions: Dict[str, int]
+
+    def __init__(self, corpus: List[Dict[str, Any]]) -> None:
+        self.responses = {}
+        self.served = {}
+        self._positions = {}
+        for entry in corpus:
+            self.responses.setdefault(entry["command"], []).append(entry)
+
+    def assist(self, command: str) -> tuple:
+        """Return the next recorded response for the command, cycling through them."""
+        entries = self.responses[command]
+        position = self._positions.get(command, 0)
+        self._positions[command] = (position + 1) % len(entries)
+        entry = self.served[command] = entries[position]
+        html = entry["html"]
+        return (
+            entry["text"],
+            html.encode("utf-8") if html is not None else None,
+            b"",
+        )
+
+
+# pylint: disable=R0903
+class ReplayAssistant(GoogleAssistant):
+    """GoogleAssistant that replays a corpus instead of calling the API."""
+
+    replay: ReplayTextAssistant
+
+    def __init__(
+        self, corpus: List[Dict[str, Any]], lang: str = DEFAULT_LANGUAGE
+    ) -> None:
+        self.replay = ReplayTextAssistant(corpus)
+        # The replaying Text Assistant is shared by all languages
+        super().__init__(
+            {"GOOGLE_API_LANGUAGE": lang},
+            lambda _lang: self.replay,  # type: ignore[arg-type, return-value]
+        )
+
+
+def _mismatch(entry: Dict[str, Any], expected: Any, actual: Any) -> Dict[str, Any]:
+    """Describe a difference from the result recorded for the entry."""
+    return {"command": entry["command"], "expected": expected, "actual": actual}
+
+
+def _replay_extraction(
+    assistant: ReplayAssistant, corpus: List[Dict[str, Any]], iterations: int
+) -> Dict[str, Any]:
+    """Check the extracted text against the text extracted at record time and
+    time the extraction from the raw HTML."""
+    # pylint: disable=protected-access
+    html_entries = [entry for entry in corpus if entry.get("html")]
+    mismatches = []
+    for entry in html_entries:
+        if "extracted" not in entry:
+            continue
+        extracted = assistant._extract_response(entry["html"])
+        if extracted != entry["extracted"]:
+            mismatches.append(_mismatch(entry, entry["extracted"], extracted))
+    checked = sum(1 for entry in html_entries if "extracted" in entry)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for entry in html_entries:
+            assistant._extract_response(entry["html"])
+    elapsed = time.perf_counter() - started
+    return {
+        "checked": checked,
+        "matched": checked - len(mismatches),
+        "mismatches": mismatches[:MAX_MISMATCHES],
+        "responses_per_sec": _rate(len(html_entries) * iterations, elapsed),
+    }
+
+
+def _replay_updates(
+    assistant: ReplayAssistant, mqtt_config: Dict[str, Any], iterations: int
+) -> Dict[str, Any]:
+    """Check and time full update cycles over the recorded publish keys."""
+    responses = assistant.replay.responses
+    all_keys = mqtt_config.get("publish", {})
+    publish = {
+        key: {
+            field: setting
+            for field, setting in value.items()
+            if field not in SCHEDULING_FIELDS
+        }
+        for key, value in all_keys.items()
+        if value["command"] in responses
+    }
+    updater = DataUpdater(
+        assistant,
+        {"publish": publish},
+        quota=CallQuota.unlimited(),
+    )
+    keys: Dict[str, Dict[str, Any]] = {
+        key: {"matched": 0, "mismatched": 0, "unchecked": 0, "mismatches": []}
+        for key in publish
+    }
+    cycles = iterations * max(
+        (len(responses[value["command"]]) for value in publish.values()), default=0
+    )
+    started = time.perf_counter()
+    for _ in range(cycles):
+        # Replay every key on each cycle regardless of its polling interval,
+        # rules, conditions and active windows
+        updater.next_update.clear()
+        data = updater.update_data()
+        for key, counts in keys.items():
+            entry = assistant.replay.served[publish[key]["command"]]
+            if "value" not in entry:
+                counts["unchecked"] += 1
+            elif data.get_value(key) == entry["value"]:
+                counts["matched"] += 1
+            else:
+                counts["mismatched"] += 1
+                if len(counts["mismatches"]) < MAX_MISMATCHES:
+                    counts["mismatches"].append(
+                        _mismatch(entry, entry["value"], data.get_value(key))
+                    )
+    elapsed = time.perf_counter() - started
+    return {
+        "keys": keys,
+        "skipped_keys": sorted(set(all_keys) - set(publish)),
+        "responses_per_sec": _rate(cycles * len(publish), elapsed),
+    }
+
+
+def replay(
+    corpus: List[Dict[str, Any]], mqtt_config: Dict[str, Any], iterations: int = 1
+) -> Dict[str, Any]:
+    """Replay the corpus through GoogleAssistant and DataUpdater and report
+    the differences from the results recorded with the corpus and the
+    throughput."""
+    assistant = ReplayAssistant(corpus)
+    return {
+        "entries": len(corpus),
+        "extraction": _replay_extraction(assistant, corpus, iterations),
+        "update": _replay_updates(assistant, mqtt_config, iterations),
+    }
+
+
+def _rate(count: int, elapsed: float) -> Optional[float]:
+    """Return count per second, or None if nothing was measured."""
+    return round(count / elapsed, 1) if count and elapsed > 0 else None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Replay a recorded corpus and print the report."""
+    parser = argparse.ArgumentParser(description="Replay a recorded corpus.")
+    parser.add_argument("corpus", help="path to the recorded corpus file")
+    parser.add_argument("--mqtt-config", default=MQTT_CONFIG_PATH)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    with open(args.mqtt_config, "r", encoding="utf-8") as mqtt_file:
+        mqtt_config = json.load(mqtt_file)
+    report = replay(load_corpus(args.corpus), mqtt_config, args.iterations)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+This module provides calendar-based active windows for polling and commands.
+
+A window is written as "<days> <start>-<end>", e.g. "mon-fri 08:00-20:00".
+The days can be "*", a list like "sat,sun" or a range like "fri-mon" and may be
+omitted for every day. A window ending before it starts spans midnight.
+"""
+
+import datetime
+from typing import Any, Iterable, List, Optional, Set
+from zoneinfo import ZoneInfo
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+MINUTES_PER_DAY = 24 * 60
+
+
+def _parse_days(spec: str) -> Set[int]:
+    """Parse a day specification into a set of weekdays (0 is Monday)."""
+    if spec == "*":
+        return set(range(7))
+    days: Set[int] = set()
+    for part in spec.lower().split(","):
+        first, _, last = part.partition("-")
+        if first not in DAYS or (last and last not in DAYS):
+            raise ValueError(f"Invalid days in active window: {spec}")
+        start = DAYS.index(first)
+        end = DAYS.index(last) if last else start
+        days.update((start + i) % 7 for i in range((end - start) % 7 + 1))
+    return days
+
+
+def _parse_time(spec: str) -> int:
+    """Parse a HH:MM time into minutes since midnight."""
+    hours, _, minutes = spec.partition(":")
+    minute = int(minutes or 0)
+    value = int(hours) * 60 + minute
+    if not 0 <= minute < 60 or not 0 <= value <= MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time in active window: {spec}")
+    return value
+
+
+# pylint: disable=R0903
+class Window:
+    """A recurring daily time range on a set of weekdays."""
+
+    __slots__ = ("days", "start", "end")
+
+    days: Set[int]
+    start: int
+    end: int
+
+    def __init__(self, spec: str) -> None:
+        parts = spec.split()
+        if len(parts) not in (1, 2):
+            raise ValueError(f"Invalid active window: {spec}")
+        self.days = _parse_days(parts[0] if len(parts) == 2 else "*")
+        start, _, end = parts[-1].partition("-")
+        try:
+            self.start = _parse_time(start)
+            self.end = _parse_time(end)
+        except ValueError as e:
+            raise ValueError(f"Invalid active window: {spec}") from e
+        if self.start == self.end:
+            raise ValueError(f"Empty active window: {spec}")
+
+    def contains(self, weekday: int, minute: float) -> bool:
+        """Check if the minute of the weekday lies within the window."""
+        if self.start < self.end:
+            return weekday in self.days and self.start <= minute < self.end
+        # The window spans midnight
+        return (weekday in self.days and minute >= self.start) or (
+            (weekday - 1) % 7 in self.days and minute < self.end
+        )
+
+
+class Schedule:
+    """A set of active windows in a timezone (the local time if None)."""
+
+    windows: List[Window]
+    timezone: Optional[datetime.tzinfo]
+
+    def __init__(self, windows: Iterable[str], timezone: Optional[str] = None) -> None:
+        self.windows = [Window(spec) for spec in windows]
+        if not self.windows:
+            raise ValueError("Active windows must not be empty")
+        self.timezone = ZoneInfo(timezone) if timezone else None
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional["Schedule"]:
+        """Create the schedule of a config entry, or None if it is always active."""
+        if not isinstance(config, dict) or "active" not in config:
+            return None
+        return cls(config["active"], config.get("timezone"))
+
+    @classmethod
+    def never(cls) -> "Schedule":
+        """Create a schedule that is never active."""
+        schedule = cls.__new__(cls)
+        schedule.windows = []
+        schedule.timezone = None
+        return schedule
+
+    @classmethod
+    def from_pause_hours(cls, pause_hours: Iterable[int]) -> Optional["Schedule"]:
+        """Create a schedule in local time that is inactive in the given hours."""
+        pause = set(pause_hours)
+        if not pause:
+            return None
+        if pause.issuperset(range(24)):
+            return cls.never()
+        return cls(
+            f"{hour:02d}:00-{hour + 1:02d}:00"
+            for hour in range(24)
+            if hour not in pause
+        )
+
+    def _now(self, timestamp: float) -> datetime.datetime:
+        """Convert the timestamp into a datetime in the schedule's timezone."""
+        return datetime.datetime.fromtimestamp(timestamp, self.timezone)
+
+    def is_active(self, timestamp: float) -> bool:
+        """Check if the timestamp lies within one of the windows."""
+        now = self._now(timestamp)
+        minute = now.hour * 60 + now.minute + now.second / 60
+        return any(window.contains(now.weekday(), minute) for window in self.windows)
+
+    def next_active(self, timestamp: float) -> float:
+        """Return the first timestamp at or after the given one that lies within
+        one of the windows."""
+        if self.is_active(timestamp):
+            return timestamp
+        today = self._now(timestamp).date()
+        starts: List[float] = []
+        for offset in range(8):
+            day = today + datetime.timedelta(days=offset)
+            for window in self.windows:
+                if day.weekday() not in window.days:
+                    continue
+                hour, minute = divmod(window.start, 60)
+                start = datetime.datetime(
+                    day.year, day.month, day.day, tzinfo=self.timezone
+                ) + datetime.timedelta(hours=hour, minutes=minute)
+                if start.timestamp() > timestamp:
+                    starts.append(start.timestamp())
+            if starts:
+                return min(starts)
+        raise ValueError("Schedule has no upcoming active window")
+
+
+def next_active(schedules: Iterable[Optional[Schedule]], timestamp: float) -> float:
+    """Return the first timestamp at or after the given one at which all
+    schedules are active."""
+    active = [schedule for schedule in schedules if schedule is not None]
+    # Each iteration jumps to the start of the next window, so this terminates
+    # after at most a few weeks worth of windows.
+    for _ in range(1000):
+        candidate = timestamp
+        for schedule in active:
+            candidate = schedule.next_active(candidate)
+        if candidate == timestamp:
+            return timestamp
+        timestamp = candidate
+    raise ValueError("Schedules have no common active window")
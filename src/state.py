@@ -0,0 +1,146 @@
+"""
+This module provides the typed state model for the values read from the Google
+Assistant and builds the MQTT status payload from cached JSON fragments.
+"""
+
+import datetime
+import json
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def format_date(timestamp: float) -> str:
+    """Format the timestamp as a string."""
+    return datetime.datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class KeyState:
+    """State of a single published key."""
+
+    __slots__ = ("name", "value", "timestamp", "version", "error", "_fragment")
+
+    name: str
+    value: Any
+    timestamp: float
+    version: int
+    error: Optional[str]
+    _fragment: Optional[str]
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.value = None
+        self.timestamp = 0
+        self.version = 0
+        self.error = None
+        self._fragment = None
+
+    def update(self, value: Any, timestamp: float, error: Optional[str] = None) -> bool:
+        """Set the value of the key. Returns True if the value changed."""
+        self.timestamp = timestamp
+        self.error = error
+        # pylint: disable=unidiomatic-typecheck
+        if type(value) is type(self.value) and value == self.value:
+            return False
+        self.value = value
+        self.version += 1
+        self._fragment = None
+        return True
+
+    def fragment(self) -> str:
+        """Return the serialized '"name": value' fragment of the payload."""
+        if self._fragment is None:
+            self._fragment = f"{json.dumps(self.name)}: {json.dumps(self.value)}"
+        return self._fragment
+
+
+# pylint: disable=R0902
+class DeviceState:
+    """State of all published keys and the bookkeeping of the data updates."""
+
+    __slots__ = (
+        "keys",
+        "timestamp",
+        "error",
+        "sdk_calls_today",
+        "sdk_calls_today_date",
+        "version",
+        "_header",
+        "_body",
+        "_lock",
+    )
+
+    keys: Dict[str, KeyState]
+    timestamp: float
+    error: Optional[str]
+    sdk_calls_today: int
+    sdk_calls_today_date: Optional[str]
+    version: int
+    _header: Optional[Tuple[Tuple[int, Optional[str], float], str]]
+    _body: Optional[Tuple[int, Tuple[str, ...], str]]
+    _lock: threading.Lock
+
+    def __init__(self) -> None:
+        self.keys = {}
+        self.timestamp = 0
+        self.error = None
+        self.sdk_calls_today = 0
+        self.sdk_calls_today_date = None
+        self.version = 0
+        self._header = None
+        self._body = None
+        self._lock = threading.Lock()
+
+    def key(self, name: str) -> KeyState:
+        """Return the state of the key, creating it if necessary."""
+        state = self.keys.get(name)
+        if state is None:
+            state = self.keys[name] = KeyState(name)
+        return state
+
+    def get_value(self, name: str) -> Any:
+        """Return the last value of the key, or None if it was never set."""
+        state = self.keys.get(name)
+        return state.value if state is not None else None
+
+    def set_value(
+        self, name: str, value: Any, timestamp: float, error: Optional[str] = None
+    ) -> None:
+        """Set the value of the key and bump the state version if it changed."""
+        with self._lock:
+            if self.key(name).update(value, timestamp, error):
+                self.version += 1
+
+    def set_call_count(self, calls: int, date: Optional[str]) -> None:
+        """Set the number of calls made on the given date."""
+        with self._lock:
+            self.sdk_calls_today = calls
+            self.sdk_calls_today_date = date
+
+    def _header_fragment(self) -> str:
+        """Return the serialized bookkeeping fields of the payload."""
+        header_key = (self.sdk_calls_today, self.error, self.timestamp)
+        if self._header is None or self._header[0] != header_key:
+            calls, error, timestamp = header_key
+            header = {
+                "sdk_calls_today": int(calls),
+                "error": error,
+                "timestamp": format_date(timestamp) if timestamp else None,
+            }
+            self._header = (header_key, json.dumps(header)[1:-1])
+        return self._header[1]
+
+    def _body_fragment(self, names: Tuple[str, ...]) -> str:
+        """Return the serialized values of the keys, regenerating only the
+        fragments of keys whose version changed."""
+        if self._body is None or self._body[:2] != (self.version, names):
+            fragments: List[str] = [self.key(name).fragment() for name in names]
+            self._body = (self.version, names, ", ".join(fragments))
+        return self._body[2]
+
+    def to_json(self, names: Sequence[str]) -> str:
+        """Serialize the state of the given keys as the MQTT status payload.
+        The state may be serialized and updated from different threads."""
+        with self._lock:
+            body = self._body_fragment(tuple(names))
+            header = self._header_fragment()
+        return "{" + header + (", " + body if body else "") + "}"
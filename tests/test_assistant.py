@@ -71,6 +71,81 @@ class TestGoogleAssistant(unittest.TestCase):
         # Verify the original exception was properly logged
         # This requires patching the logger in your implementation
 
+    @patch("src.assistant.CorpusRecorder")
+    @patch("src.assistant.TextAssistant")
+    @patch("src.assistant.Credentials.from_authorized_user_file")
+    def test_recording_error(
+        self,
+        _mock_creds: MagicMock,
+        mock_text_assistant: MagicMock,
+        mock_recorder: MagicMock,
+    ) -> None:
+        """Test that an error while recording does not count as a failed call."""
+        server_config: Dict[str, Any] = {"ASSISTANT_RECORD_PATH": "corpus.jsonl.gz"}
+        mock_text_assistant_instance = mock_text_assistant.return_value
+        mock_text_assistant_instance.assist.return_value = (
+            "",
+            b'<div class="show_text_content">Test Response</div>',
+        )
+        mock_recorder.return_value.record.side_effect = ValueError("Record error")
+
+        assistant = GoogleAssistant(server_config)
+
+        self.assertEqual(assistant.call_assistant("Test Command"), "Test Response")
+        self.assertEqual(assistant.get_stats()["en-US"]["calls"], 1)
+        self.assertEqual(assistant.get_stats()["en-US"]["errors"], 0)
+        mock_text_assistant_instance.close.assert_not_called()
+        self.assertEqual(mock_text_assistant.call_count, 1)
+
+    @patch("src.assistant.time.monotonic")
+    @patch("src.assistant.TextAssistant")
+    @patch("src.assistant.Credentials.from_authorized_user_file")
+    def test_language_pool(
+        self,
+        _mock_creds: MagicMock,
+        mock_text_assistant: MagicMock,
+        mock_monotonic: MagicMock,
+    ) -> None:
+        """Test that commands are routed to a Text Assistant per language."""
+        server_config: Dict[str, Any] = {
+            "GOOGLE_API_LANGUAGE": "en-US",
+            "ASSISTANT_IDLE_TIMEOUT": 600,
+        }
+        mock_monotonic.return_value = 0.0
+        mock_text_assistant.side_effect = lambda _creds, lang, display: MagicMock(
+            lang=lang,
+            assist=MagicMock(
+                return_value=(
+                    "",
+                    f'<div class="show_text_content">{lang}</div>'.encode(),
+                )
+            ),
+        )
+
+        assistant = GoogleAssistant(server_config)
+        self.assertEqual(list(assistant.text_assistants), ["en-US"])
+
+        # Other languages are created lazily and reused
+        self.assertEqual(assistant.call_assistant("Test", "de-DE"), "de-DE")
+        self.assertEqual(assistant.call_assistant("Test", "de-DE"), "de-DE")
+        self.assertEqual(assistant.call_assistant("Test"), "en-US")
+        self.assertEqual(mock_text_assistant.call_count, 2)
+
+        stats = assistant.get_stats()
+        self.assertEqual(stats["de-DE"]["calls"], 2)
+        self.assertEqual(stats["en-US"]["calls"], 1)
+        self.assertEqual(stats["en-US"]["errors"], 0)
+
+        # Idle languages are closed without another call, the default
+        # language is kept
+        german = assistant.text_assistants["de-DE"]
+        mock_monotonic.return_value = 601.0
+        assistant.evict_idle()
+        self.assertEqual(list(assistant.text_assistants), ["en-US"])
+        german.close.assert_called_once()
+        self.assertEqual(assistant.call_assistant("Test", "de-DE"), "de-DE")
+        self.assertEqual(mock_text_assistant.call_count, 3)
+
 
 if __name__ == "__main__":
     unittest.main()
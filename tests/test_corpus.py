@@ -0,0 +1,46 @@
+"""Unit tests for the CorpusRecorder class and corpus loading."""
+
+import os
+import tempfile
+import unittest
+
+from src.corpus import CorpusRecorder, load_corpus
+
+
+class TestCorpusRecorder(unittest.TestCase):
+    """Test cases for the CorpusRecorder class."""
+
+    def test_record_and_load(self) -> None:
+        """Test that recorded responses can be loaded again."""
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            path = os.path.join(corpus_dir, "corpus.jsonl.gz")
+            recorder = CorpusRecorder(path)
+            recorder.record(
+                "Test Command",
+                "en-US",
+                ("Test", b'<div class="show_text_content">Test</div>', b""),
+                0.1234,
+                {"extracted": "Test", "value": "Run"},
+            )
+            # A second recorder appends to the same corpus
+            CorpusRecorder(path).record(
+                "Other Command", "de-DE", "Other", 0.5, {"extracted": "Other"}
+            )
+
+            corpus = load_corpus(path)
+
+        self.assertEqual(len(corpus), 2)
+        self.assertEqual(corpus[0]["command"], "Test Command")
+        self.assertEqual(corpus[0]["text"], "Test")
+        self.assertEqual(corpus[0]["html"], '<div class="show_text_content">Test</div>')
+        self.assertEqual(corpus[0]["latency"], 0.123)
+        self.assertEqual(corpus[0]["extracted"], "Test")
+        self.assertEqual(corpus[0]["value"], "Run")
+        self.assertNotIn("value", corpus[1])
+        self.assertEqual(corpus[1]["lang"], "de-DE")
+        self.assertIsNone(corpus[1]["text"])
+        self.assertEqual(corpus[1]["html"], "Other")
+
+
+if __name__ == "__main__":
+    unittest.main()
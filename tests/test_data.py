@@ -1,10 +1,28 @@
 """Unit tests for the DataUpdater class and its data update logic."""
 
+import time
 import unittest
-from unittest.mock import patch, MagicMock
-from typing import Any, Dict
+from unittest.mock import ANY, patch, MagicMock
+from typing import Any, Dict, List
 
+from src.assistant import AssistantResponse
 from src.data import DataUpdater
+from src.quota import CallQuota
+from src.schedule import Schedule
+from src.state import DeviceState
+
+
+def _responses(*answers: Any) -> List[Any]:
+    """Wrap the answer texts as responses of the Google Assistant, exceptions
+    are passed through."""
+    return [
+        (
+            AssistantResponse("", "en-US", answer, answer, 0.0)
+            if isinstance(answer, str)
+            else answer
+        )
+        for answer in answers
+    ]
 
 
 class TestDataUpdater(unittest.TestCase):
@@ -14,7 +32,7 @@ class TestDataUpdater(unittest.TestCase):
         """Test the update_data method."""
         # Mock assistant and MQTT configuration
         mock_assistant: MagicMock = MagicMock()
-        mock_assistant.call_assistant.side_effect = ["Result: 1", "Value: TestValue"]
+        mock_assistant.assist.side_effect = _responses("Result: 1", "Value: TestValue")
 
         mock_mqtt_config: Dict[str, Any] = {
             "publish": {
@@ -27,6 +45,7 @@ class TestDataUpdater(unittest.TestCase):
                     "command": "Test Command 2",
                     "regex": r"Value: (\w+)",
                     "result_map": {},
+                    "language": "de-DE",
                 },
             }
         }
@@ -35,25 +54,30 @@ class TestDataUpdater(unittest.TestCase):
         data_updater: DataUpdater = DataUpdater(mock_assistant, mock_mqtt_config)
 
         # Call update_data
-        data: Dict[str, Any] = data_updater.update_data()
+        data: DeviceState = data_updater.update_data()
 
-        # Assert data cache updates
-        self.assertEqual(data["key1"], "Success")
-        self.assertEqual(data["key2"], "TestValue")
-        self.assertIsNotNone(data["timestamp"])
-        self.assertEqual(data["error"], "")
+        # Assert state updates
+        self.assertEqual(data.get_value("key1"), "Success")
+        self.assertEqual(data.get_value("key2"), "TestValue")
+        self.assertIsNotNone(data.timestamp)
+        self.assertEqual(data.error, "")
+        self.assertEqual(data.sdk_calls_today, 2)
 
         # Assert assistant calls
-        mock_assistant.call_assistant.assert_any_call("Test Command 1")
-        mock_assistant.call_assistant.assert_any_call("Test Command 2")
-        self.assertEqual(mock_assistant.call_assistant.call_count, 2)
+        mock_assistant.assist.assert_any_call("Test Command 1", None)
+        mock_assistant.assist.assert_any_call("Test Command 2", "de-DE")
+        self.assertEqual(mock_assistant.assist.call_count, 2)
+
+        # The parsed values are recorded with the responses
+        mock_assistant.record.assert_any_call(ANY, value="Success")
+        mock_assistant.record.assert_any_call(ANY, value="TestValue")
 
     @patch("src.data.logger")
     def test_update_data_error_handling(self, mock_logger: MagicMock) -> None:
         """Test the update_data method."""
-        # Mock call_assistant to raise an exception
+        # Mock assist to raise an exception
         mock_assistant: MagicMock = MagicMock()
-        mock_assistant.call_assistant.side_effect = RuntimeError("Test error")
+        mock_assistant.assist.side_effect = RuntimeError("Test error")
 
         mock_mqtt_config: Dict[str, Any] = {
             "publish": {
@@ -69,15 +93,225 @@ class TestDataUpdater(unittest.TestCase):
         data_updater: DataUpdater = DataUpdater(mock_assistant, mock_mqtt_config)
 
         # Call update_data
-        data: Dict[str, Any] = data_updater.update_data()
+        data: DeviceState = data_updater.update_data()
 
         # Assert that the error was logged
         mock_logger.error.assert_called_once()
 
-        # Assert that data_cache was updated with the error
-        self.assertEqual(data["error"], "Test error")
-        self.assertIsNotNone(data["timestamp"])
-        self.assertIsNone(data["key1"])
+        # Assert that the state was updated with the error
+        self.assertEqual(data.error, "Test error")
+        self.assertIsNotNone(data.timestamp)
+        self.assertIsNone(data.get_value("key1"))
+        self.assertEqual(data.key("key1").error, "Test error")
+
+    @patch("src.data.time.time")
+    def test_update_data_error_single_key(self, mock_time: MagicMock) -> None:
+        """Test that an error only clears the key that failed."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_time.return_value = 1000.0
+
+        mock_mqtt_config: Dict[str, Any] = {
+            "publish": {
+                "key1": {"command": "Command 1", "interval": 60},
+                "key2": {"command": "Command 2", "interval": 60},
+                "key3": {"command": "Command 3", "interval": 600},
+            }
+        }
+
+        data_updater: DataUpdater = DataUpdater(mock_assistant, mock_mqtt_config)
+        mock_assistant.assist.side_effect = _responses("1", "2", "3")
+        data_updater.update_data()
+
+        # key1 fails, key2 is still polled and key3 is not due
+        mock_time.return_value = 1060.0
+        mock_assistant.assist.side_effect = _responses(RuntimeError("Test error"), "4")
+        data: DeviceState = data_updater.update_data()
+
+        self.assertEqual(data.error, "Test error")
+        self.assertIsNone(data.get_value("key1"))
+        self.assertEqual(data.key("key1").error, "Test error")
+        self.assertEqual(data.get_value("key2"), "4")
+        self.assertIsNone(data.key("key2").error)
+        self.assertEqual(data.get_value("key3"), "3")
+        self.assertEqual(data_updater.next_update["key1"], 1360)
+        self.assertEqual(data_updater.next_update["key2"], 1120)
+        self.assertEqual(data_updater.next_update["key3"], 1600)
+
+    @patch("src.data.time.time")
+    def test_update_data_rules(self, mock_time: MagicMock) -> None:
+        """Test that rules pick the interval and disable dependent keys."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_time.return_value = 1000.0
+
+        mock_mqtt_config: Dict[str, Any] = {
+            "publish": {
+                "status": {
+                    "command": "Status Command",
+                    "interval": 300,
+                    "rules": {
+                        "Run": {"interval": 60},
+                        "Dock": {"interval": 3600, "disable": ["battery"]},
+                    },
+                },
+                "battery": {"command": "Battery Command", "interval": 120},
+            }
+        }
+
+        data_updater: DataUpdater = DataUpdater(mock_assistant, mock_mqtt_config)
+
+        # First run polls all keys
+        mock_assistant.assist.side_effect = _responses("Run", "80")
+        data_updater.update_data()
+        self.assertEqual(data_updater.next_update, {"status": 1060, "battery": 1120})
+        self.assertEqual(data_updater.seconds_until_next_update(), 60)
+
+        # Only the status is due, the mower is docked now
+        mock_time.return_value = 1060.0
+        mock_assistant.assist.side_effect = _responses("Dock")
+        data_updater.update_data()
+        mock_assistant.assist.assert_called_with("Status Command", None)
+        self.assertEqual(data_updater.next_update["status"], 4660)
+        self.assertFalse(data_updater.is_active("battery"))
+
+        # The battery is disabled while the mower is docked
+        mock_time.return_value = 1200.0
+        mock_assistant.assist.reset_mock()
+        data = data_updater.update_data()
+        mock_assistant.assist.assert_not_called()
+        self.assertEqual(data.get_value("battery"), "80")
+        self.assertEqual(data_updater.seconds_until_next_update(), 3460)
+
+    @patch("src.data.time.time")
+    def test_update_data_rules_error(self, mock_time: MagicMock) -> None:
+        """Test that a disabled key is polled again when the controlling key
+        fails, as no rule applies to a missing value."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_time.return_value = 1000.0
+        mock_mqtt_config: Dict[str, Any] = {
+            "publish": {
+                "status": {
+                    "command": "Status Command",
+                    "interval": 60,
+                    "rules": {"Dock": {"disable": ["battery"]}},
+                },
+                "battery": {"command": "Battery Command", "interval": 60},
+            }
+        }
+        data_updater: DataUpdater = DataUpdater(mock_assistant, mock_mqtt_config)
+
+        mock_assistant.assist.side_effect = _responses("Dock")
+        data_updater.update_data()
+        self.assertFalse(data_updater.is_active("battery"))
+
+        mock_time.return_value = 1060.0
+        mock_assistant.assist.side_effect = _responses(RuntimeError("Error"), "80")
+        data = data_updater.update_data()
+        self.assertTrue(data_updater.is_active("battery"))
+        self.assertEqual(data.get_value("battery"), "80")
+
+    @patch("src.data.time.time")
+    def test_update_data_poll_when(self, mock_time: MagicMock) -> None:
+        """Test that a key is only polled while another key has given values."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_time.return_value = 1000.0
+        mock_mqtt_config: Dict[str, Any] = {
+            "publish": {
+                "status": {"command": "Status Command", "interval": 60},
+                "battery": {
+                    "command": "Battery Command",
+                    "interval": 60,
+                    "poll_when": {"status": ["Run"]},
+                },
+            }
+        }
+        data_updater: DataUpdater = DataUpdater(mock_assistant, mock_mqtt_config)
+
+        # The battery is polled while running
+        mock_assistant.assist.side_effect = _responses("Run", "80")
+        data_updater.update_data()
+        self.assertEqual(mock_assistant.assist.call_count, 2)
+
+        # It is not polled for other values, nor when the status fails
+        for status in _responses("Pause", RuntimeError("Error")):
+            mock_time.return_value += 60
+            mock_assistant.assist.reset_mock()
+            mock_assistant.assist.side_effect = [status]
+            data = data_updater.update_data()
+            mock_assistant.assist.assert_called_once_with("Status Command", None)
+            self.assertFalse(data_updater.is_active("battery"))
+            self.assertEqual(data.get_value("battery"), "80")
+
+    @patch("src.data.time.time")
+    def test_update_data_active_windows(self, mock_time: MagicMock) -> None:
+        """Test that keys are only polled within their active windows."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_assistant.assist.return_value = _responses("Dock")[0]
+        # Monday, 2025-07-21 06:00 UTC
+        mock_time.return_value = 1753077600.0
+
+        mock_mqtt_config: Dict[str, Any] = {
+            "publish": {
+                "status": {
+                    "command": "Status Command",
+                    "active": ["mon-fri 08:00-20:00"],
+                    "timezone": "UTC",
+                },
+            }
+        }
+
+        data_updater: DataUpdater = DataUpdater(mock_assistant, mock_mqtt_config)
+
+        # Outside of the window nothing is polled and we sleep until 08:00
+        data_updater.update_data()
+        mock_assistant.assist.assert_not_called()
+        self.assertEqual(data_updater.seconds_until_next_update(), 2 * 3600)
+
+        # Within the window the key is polled
+        mock_time.return_value += 2 * 3600
+        data_updater.update_data()
+        mock_assistant.assist.assert_called_once_with("Status Command", None)
+        self.assertEqual(data_updater.seconds_until_next_update(), 300)
+
+    def test_update_data_quota_used_up(self) -> None:
+        """Test that no key is polled until the polling quota is reset."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_assistant.assist.side_effect = _responses("1")
+        mock_mqtt_config: Dict[str, Any] = {
+            "publish": {
+                "key1": {"command": "Command 1", "interval": 60},
+                "key2": {"command": "Command 2", "interval": 60},
+            }
+        }
+        quota = CallQuota({"GOOGLE_API_DAILY_LIMIT": 1, "COMMAND_QUOTA_SHARE": 0})
+        data_updater: DataUpdater = DataUpdater(
+            mock_assistant, mock_mqtt_config, quota=quota
+        )
+
+        data_updater.update_data()
+
+        mock_assistant.assist.assert_called_once_with("Command 1", None)
+        self.assertNotIn("key2", data_updater.next_update)
+        self.assertAlmostEqual(
+            data_updater.seconds_until_next_update(),
+            quota.next_reset() - time.time(),
+            delta=5,
+        )
+
+    @patch("src.data.logger")
+    def test_seconds_until_next_update_always_paused(
+        self, mock_logger: MagicMock
+    ) -> None:
+        """Test that the reload interval is used if the pause never ends and
+        the key is only reported once."""
+        mock_mqtt_config: Dict[str, Any] = {
+            "publish": {"status": {"command": "Status Command"}}
+        }
+        data_updater: DataUpdater = DataUpdater(MagicMock(), mock_mqtt_config, 600)
+        pause = Schedule.from_pause_hours(range(24))
+
+        self.assertEqual(data_updater.seconds_until_next_update(pause), 600)
+        self.assertEqual(data_updater.seconds_until_next_update(pause), 600)
+        mock_logger.warning.assert_called_once()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 """Unit tests for the MainApplication class and its update/publish logic."""
 
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 from typing import Any, Dict
@@ -29,12 +30,13 @@ class TestMainApplication(unittest.TestCase):
         """Test the update_and_publish_data method."""
         with patch("src.main.Config") as mock_config, patch(
             "src.main.GoogleAssistant"
-        ) as _mock_google_assistant, patch(
+        ) as mock_google_assistant, patch(
             "src.main.DataUpdater"
         ) as mock_data_updater, patch(
             "src.main.MQTTClient"
         ) as mock_mqtt_client, patch(
-            "src.main.time.localtime", return_value=MagicMock(tm_hour=current_hour)
+            "src.main.time.time",
+            return_value=time.mktime((2025, 7, 21, current_hour, 30, 0, 0, 0, -1)),
         ):
 
             # Mock Config
@@ -45,7 +47,8 @@ class TestMainApplication(unittest.TestCase):
             # Mock DataUpdater behavior
             mock_data_updater_instance = mock_data_updater.return_value
             mock_data_updater_instance.update_data.return_value = {"key": "value"}
-            mock_data_updater_instance.data_cache = {"key": "cached_value"}
+            cached_state = MagicMock(sdk_calls_today=1)
+            mock_data_updater_instance.state = cached_state
 
             # Mock MQTTClient behavior
             mock_mqtt_client_instance = mock_mqtt_client.return_value
@@ -57,6 +60,9 @@ class TestMainApplication(unittest.TestCase):
             # Simulate the current hour
             app.update_and_publish_data()
 
+            # Idle Text Assistants are closed on every run of the update loop
+            mock_google_assistant.return_value.evict_idle.assert_called_once()
+
             if should_update:
                 mock_data_updater_instance.update_data.assert_called_once()
                 mock_mqtt_client_instance.publish_to_mqtt.assert_called_once_with(
@@ -65,9 +71,45 @@ class TestMainApplication(unittest.TestCase):
             else:
                 mock_data_updater_instance.update_data.assert_not_called()
                 mock_mqtt_client_instance.publish_to_mqtt.assert_called_once_with(
-                    {"key": "cached_value"}
+                    cached_state
                 )
 
+    @parameterized.expand(
+        [
+            ("next_key_due", {}, 60.0, 60.0),
+            ("key_overdue", {}, 0.0, 1),
+            ("quiet_period", {}, 3600.0, 3600.0),
+            ("pause_hours", {"REQUEST_PAUSE_HOURS": [2, 3]}, 7200.0, 7200.0),
+            ("all_pause_hours", {"REQUEST_PAUSE_HOURS": list(range(24))}, 300.0, 300.0),
+        ]
+    )
+    def test_get_update_delay(
+        self,
+        _name: str,
+        server_config: Dict[str, Any],
+        seconds_until_next_update: float,
+        expected_delay: float,
+    ) -> None:
+        """Test the get_update_delay method."""
+        with patch("src.main.Config") as mock_config, patch(
+            "src.main.GoogleAssistant"
+        ), patch("src.main.DataUpdater") as mock_data_updater, patch(
+            "src.main.MQTTClient"
+        ):
+            mock_config_instance = mock_config.return_value
+            mock_config_instance.get_server_config.return_value = server_config
+            mock_config_instance.get_mqtt_config.return_value = {}
+            mock_seconds = mock_data_updater.return_value.seconds_until_next_update
+            mock_seconds.return_value = seconds_until_next_update
+
+            app = MainApplication()
+
+            self.assertEqual(app.get_update_delay(), expected_delay)
+            mock_seconds.assert_called_once_with(app.pause_schedule)
+            self.assertEqual(
+                app.pause_schedule is None, "REQUEST_PAUSE_HOURS" not in server_config
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -6,6 +6,8 @@ from unittest.mock import patch, MagicMock
 from typing import Any, Dict
 
 from src.mqtt import MQTTClient
+from src.quota import CallQuota
+from src.state import DeviceState, format_date
 
 
 class TestMQTTClient(unittest.TestCase):
@@ -27,13 +29,12 @@ class TestMQTTClient(unittest.TestCase):
         }
 
         some_timestamp = 1672531200
-        data: Dict[str, Any] = {
-            "sdk_calls_today": 5,
-            "error": "",
-            "timestamp": some_timestamp,
-            "key1": "value1",
-            "key2": "value2",
-        }
+        data = DeviceState()
+        data.sdk_calls_today = 5
+        data.error = ""
+        data.timestamp = some_timestamp
+        data.set_value("key1", "value1", some_timestamp)
+        data.set_value("key2", "value2", some_timestamp)
 
         # Initialize MQTTClient
         mqtt_client: MQTTClient = MQTTClient(
@@ -47,7 +48,7 @@ class TestMQTTClient(unittest.TestCase):
         expected_payload: Dict[str, Any] = {
             "sdk_calls_today": 5,
             "error": "",
-            "timestamp": MQTTClient.format_date(some_timestamp),
+            "timestamp": format_date(some_timestamp),
             "key1": "value1",
             "key2": "value2",
         }
@@ -91,7 +92,9 @@ class TestMQTTClient(unittest.TestCase):
         )
 
         # Assert that the assistant command was called
-        mock_assistant.call_assistant.assert_called_once_with("Assistant Command 1")
+        mock_assistant.call_assistant.assert_called_once_with(
+            "Assistant Command 1", None
+        )
 
         # Test unsubscribed topic
         mock_message.topic = "test/topic/cmnd/unknown_subtopic"
@@ -116,6 +119,171 @@ class TestMQTTClient(unittest.TestCase):
             "Received command not in subscribed commands: %s", "InvalidCommand"
         )
 
+    @patch("src.mqtt.time.time")
+    @patch("src.mqtt.logger")
+    @patch("paho.mqtt.client.Client")
+    def test_on_message_active_windows(
+        self, mock_paho_client: MagicMock, mock_logger: MagicMock, mock_time: MagicMock
+    ) -> None:
+        """Test that commands are only executed within their active windows."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_server_config: Dict[str, Any] = {
+            "MQTT_TOPIC": "test/topic",
+            "MQTT_CLIENT_ID": "test_id",
+            "MQTT_SERVER": "localhost",
+            "MQTT_PORT": 1883,
+        }
+        mock_mqtt_config: Dict[str, Any] = {
+            "subscribe": {
+                "subtopic1": {
+                    "Command1": {
+                        "command": "Assistant Command 1",
+                        "active": ["08:00-20:00"],
+                        "timezone": "UTC",
+                        "language": "de-DE",
+                    }
+                }
+            }
+        }
+        mqtt_client: MQTTClient = MQTTClient(
+            mock_assistant, mock_server_config, mock_mqtt_config
+        )
+        mock_message: MagicMock = MagicMock()
+        mock_message.topic = "test/topic/cmnd/subtopic1"
+        mock_message.payload.decode.return_value = "Command1"
+
+        # Monday, 2025-07-21 06:00 UTC
+        mock_time.return_value = 1753077600.0
+        mqtt_client.on_message(None, None, mock_message)
+        mock_assistant.call_assistant.assert_not_called()
+        mock_logger.warning.assert_any_call(
+            "Rejected command %s/%s: %s",
+            "subtopic1",
+            "Command1",
+            "outside of active windows",
+        )
+        mock_paho_client.return_value.publish.assert_called_once_with(
+            "test/topic/result/subtopic1",
+            json.dumps(
+                {
+                    "command": "Command1",
+                    "status": "rejected",
+                    "reason": "outside of active windows",
+                }
+            ),
+        )
+
+        # Monday, 2025-07-21 09:00 UTC
+        mock_time.return_value = 1753088400.0
+        mqtt_client.on_message(None, None, mock_message)
+        mock_assistant.call_assistant.assert_called_once_with(
+            "Assistant Command 1", "de-DE"
+        )
+
+    @patch("paho.mqtt.client.Client")
+    def test_on_message_rate_limit_and_quota(self, mock_paho_client: MagicMock) -> None:
+        """Test that commands are rate limited and counted in the shared quota."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_server_config: Dict[str, Any] = {
+            "MQTT_TOPIC": "test/topic",
+            "MQTT_CLIENT_ID": "test_id",
+            "MQTT_SERVER": "localhost",
+            "MQTT_PORT": 1883,
+            "COMMAND_RATE": 0,
+            "COMMAND_BURST": 2,
+            "GOOGLE_API_DAILY_LIMIT": 100,
+            "COMMAND_QUOTA_SHARE": 0.03,
+        }
+        mock_mqtt_config: Dict[str, Any] = {
+            "subscribe": {
+                "subtopic1": {"Command1": "Assistant Command 1"},
+                "subtopic2": {"Command2": "Assistant Command 2"},
+            }
+        }
+        quota = CallQuota(mock_server_config)
+        state = DeviceState()
+        mqtt_client: MQTTClient = MQTTClient(
+            mock_assistant, mock_server_config, mock_mqtt_config, quota, state
+        )
+
+        def send(subtopic: str, cmnd: str) -> None:
+            mock_message: MagicMock = MagicMock()
+            mock_message.topic = f"test/topic/cmnd/{subtopic}"
+            mock_message.payload.decode.return_value = cmnd
+            mqtt_client.on_message(None, None, mock_message)
+
+        # The burst of the subtopic is used up after two commands
+        for _ in range(3):
+            send("subtopic1", "Command1")
+        self.assertEqual(mock_assistant.call_assistant.call_count, 2)
+        mock_paho_client.return_value.publish.assert_called_with(
+            "test/topic/result/subtopic1",
+            json.dumps(
+                {
+                    "command": "Command1",
+                    "status": "rejected",
+                    "reason": "rate limit exceeded",
+                }
+            ),
+        )
+
+        # Another subtopic has its own bucket, but the command quota is used up
+        send("subtopic2", "Command2")
+        send("subtopic2", "Command2")
+        self.assertEqual(mock_assistant.call_assistant.call_count, 3)
+        self.assertEqual(quota.calls_today, 3)
+        # The rejection by the quota does not use up a token of the subtopic
+        self.assertEqual(mqtt_client.rate_limiter.buckets["subtopic2"].tokens, 1)
+        # The commands are counted in the published state
+        self.assertEqual(state.sdk_calls_today, 3)
+        mock_paho_client.return_value.publish.assert_any_call(
+            "test/topic/stat", state.to_json([])
+        )
+        mock_paho_client.return_value.publish.assert_called_with(
+            "test/topic/result/subtopic2",
+            json.dumps(
+                {
+                    "command": "Command2",
+                    "status": "rejected",
+                    "reason": "daily command quota used up",
+                }
+            ),
+        )
+
+    @patch("paho.mqtt.client.Client")
+    def test_on_message_profile(self, mock_paho_client: MagicMock) -> None:
+        """Test that a diag/profile message starts the profiler."""
+        mock_assistant: MagicMock = MagicMock()
+        mock_server_config: Dict[str, Any] = {
+            "MQTT_TOPIC": "test/topic",
+            "MQTT_CLIENT_ID": "test_id",
+            "MQTT_SERVER": "localhost",
+            "MQTT_PORT": 1883,
+        }
+
+        mqtt_client: MQTTClient = MQTTClient(mock_assistant, mock_server_config, {})
+        mock_paho_client.return_value.subscribe.assert_any_call(
+            "test/topic/diag/profile"
+        )
+        mqtt_client.profiler = MagicMock()
+        mqtt_client.profiler.parse_duration.return_value = 5.0
+
+        mock_message: MagicMock = MagicMock()
+        mock_message.topic = "test/topic/diag/profile"
+        mock_message.payload.decode.return_value = "5"
+        mqtt_client.on_message(None, None, mock_message)
+
+        mqtt_client.profiler.start.assert_called_once_with(
+            5.0, mqtt_client.publish_profile
+        )
+        mock_assistant.call_assistant.assert_not_called()
+
+        # The summary is published to the result topic
+        mqtt_client.publish_profile({"samples": 1})
+        mock_paho_client.return_value.publish.assert_called_once_with(
+            "test/topic/diag/profile/result", json.dumps({"samples": 1})
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
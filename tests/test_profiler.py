@@ -0,0 +1,89 @@
+"""Unit tests for the SamplingProfiler class."""
+
+import collections
+import os
+import tempfile
+import threading
+import unittest
+from typing import Any, Dict, List
+
+from src.profiler import SamplingProfiler, DEFAULT_PROFILE_DURATION
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """Test cases for the SamplingProfiler class."""
+
+    def test_parse_duration(self) -> None:
+        """Test parsing and clamping of the requested duration."""
+        profiler = SamplingProfiler({"PROFILE_MAX_DURATION": 60})
+
+        self.assertEqual(profiler.parse_duration("5"), 5.0)
+        self.assertEqual(profiler.parse_duration(""), DEFAULT_PROFILE_DURATION)
+        self.assertEqual(profiler.parse_duration("600"), 60.0)
+        with self.assertRaises(ValueError):
+            profiler.parse_duration("-1")
+        with self.assertRaises(ValueError):
+            profiler.parse_duration("abc")
+        with self.assertRaises(ValueError):
+            profiler.parse_duration("nan")
+        with self.assertRaises(ValueError):
+            profiler.parse_duration("inf")
+
+    def test_summarize(self) -> None:
+        """Test the top-N summary of collapsed stacks per thread."""
+        profiler = SamplingProfiler({"PROFILE_TOP_N": 1})
+        stacks = collections.Counter(
+            {
+                "MainThread;run": 8,
+                "update-loop;update;search": 3,
+                "update-loop;update;compile": 1,
+            }
+        )
+
+        summary: Dict[str, Any] = profiler.summarize(stacks)
+
+        self.assertEqual(summary["samples"], 12)
+        self.assertEqual(
+            summary["threads"],
+            {
+                "MainThread": {
+                    "samples": 8,
+                    "top": [{"function": "run", "samples": 8, "percent": 100.0}],
+                },
+                "update-loop": {
+                    "samples": 4,
+                    "top": [{"function": "search", "samples": 3, "percent": 75.0}],
+                },
+            },
+        )
+
+    def test_profile_writes_collapsed_file(self) -> None:
+        """Test that a profile samples other threads and writes a file."""
+        stop = threading.Event()
+        worker = threading.Thread(target=stop.wait, name="worker", daemon=True)
+        worker.start()
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            profiler = SamplingProfiler(
+                {"PROFILE_OUTPUT_DIR": output_dir, "PROFILE_INTERVAL": 0.001}
+            )
+            results: List[Dict[str, Any]] = []
+            self.assertTrue(profiler.start(0.05, results.append))
+            self.assertFalse(profiler.start(0.05, results.append))
+            for thread in threading.enumerate():
+                if thread.name == "profiler":
+                    thread.join()
+            stop.set()
+
+            self.assertEqual(len(results), 1)
+            summary = results[0]
+            self.assertGreater(summary["samples"], 0)
+            self.assertIn("worker", summary["threads"])
+            self.assertNotIn("profiler", summary["threads"])
+            self.assertTrue(os.path.exists(summary["file"]))
+            with open(summary["file"], "r", encoding="utf-8") as profile_file:
+                self.assertIn("worker;", profile_file.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
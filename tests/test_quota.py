@@ -0,0 +1,109 @@
+"""Unit tests for the rate limiting and quota accounting classes."""
+
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+
+from src.quota import CallQuota, CommandRateLimiter, TokenBucket, COMMAND, POLL
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test cases for the TokenBucket class."""
+
+    @patch("src.quota.time.monotonic")
+    def test_refill(self, mock_monotonic: MagicMock) -> None:
+        """Test that tokens are consumed and refilled over time."""
+        mock_monotonic.return_value = 0.0
+        bucket = TokenBucket(rate=6, capacity=2)
+
+        for _ in range(2):
+            self.assertTrue(bucket.has_token())
+            bucket.take()
+        self.assertFalse(bucket.has_token())
+
+        # 6 tokens per minute: one token after 10 seconds, at most the capacity
+        mock_monotonic.return_value = 10.0
+        self.assertTrue(bucket.has_token())
+        mock_monotonic.return_value = 600.0
+        bucket.refill()
+        self.assertEqual(bucket.tokens, 2)
+
+
+class TestCommandRateLimiter(unittest.TestCase):
+    """Test cases for the CommandRateLimiter class."""
+
+    def test_global_bucket(self) -> None:
+        """Test that the global bucket limits commands across subtopics."""
+        limiter = CommandRateLimiter(
+            {
+                "COMMAND_RATE": 0,
+                "COMMAND_BURST": 2,
+                "COMMAND_GLOBAL_RATE": 0,
+                "COMMAND_GLOBAL_BURST": 3,
+            }
+        )
+
+        self.assertTrue(limiter.try_acquire("subtopic1"))
+        self.assertTrue(limiter.try_acquire("subtopic1"))
+        self.assertFalse(limiter.try_acquire("subtopic1"))
+        self.assertTrue(limiter.try_acquire("subtopic2"))
+        self.assertFalse(limiter.try_acquire("subtopic2"))
+        # A rejection does not consume a token of the subtopic
+        self.assertEqual(limiter.buckets["subtopic2"].tokens, 1)
+
+
+class TestCallQuota(unittest.TestCase):
+    """Test cases for the CallQuota class."""
+
+    def test_reserved_command_share(self) -> None:
+        """Test that polling cannot use the share reserved for commands."""
+        quota = CallQuota({"GOOGLE_API_DAILY_LIMIT": 10, "COMMAND_QUOTA_SHARE": 0.2})
+
+        self.assertEqual(quota.limits, {POLL: 8, COMMAND: 2})
+        self.assertEqual(sum(quota.try_acquire(POLL) for _ in range(10)), 8)
+        self.assertFalse(quota.has_capacity(POLL))
+        self.assertTrue(quota.has_capacity(COMMAND))
+        self.assertEqual(sum(quota.try_acquire(COMMAND) for _ in range(10)), 2)
+        self.assertEqual(quota.calls_today, 10)
+
+    def test_unlimited(self) -> None:
+        """Test that an unlimited quota counts but never rejects calls."""
+        quota = CallQuota.unlimited()
+
+        self.assertEqual(sum(quota.try_acquire(POLL) for _ in range(1000)), 1000)
+        self.assertTrue(quota.try_acquire(COMMAND))
+        self.assertEqual(quota.calls_today, 1001)
+
+    @patch("src.quota.logger")
+    def test_warn_once_per_day(self, mock_logger: MagicMock) -> None:
+        """Test that a used up quota is only reported once."""
+        quota = CallQuota({"GOOGLE_API_DAILY_LIMIT": 1, "COMMAND_QUOTA_SHARE": 0})
+
+        for _ in range(5):
+            quota.try_acquire(POLL)
+        mock_logger.warning.assert_called_once()
+
+    def test_next_reset(self) -> None:
+        """Test that the counters are reset at the next local midnight."""
+        reset = CallQuota.next_reset()
+
+        self.assertGreater(reset, time.time())
+        self.assertLessEqual(reset, time.time() + 25 * 3600)
+        self.assertEqual(time.localtime(reset)[3:6], (0, 0, 0))
+
+    @patch("src.quota.datetime.date")
+    def test_reset_on_new_day(self, mock_date: MagicMock) -> None:
+        """Test that the counters are reset on a new day."""
+        mock_date.today.return_value.isoformat.return_value = "2025-07-20"
+        quota = CallQuota()
+        quota.try_acquire(POLL)
+        quota.try_acquire(COMMAND)
+        self.assertEqual(quota.calls_today, 2)
+
+        mock_date.today.return_value.isoformat.return_value = "2025-07-21"
+        self.assertEqual(quota.calls_today, 0)
+        self.assertEqual(quota.date, "2025-07-21")
+
+
+if __name__ == "__main__":
+    unittest.main()
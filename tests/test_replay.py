@@ -0,0 +1,146 @@
+"""Unit tests for replaying a recorded corpus."""
+
+import unittest
+from typing import Any, Dict, List
+from unittest.mock import patch, MagicMock
+
+from src.replay import ReplayAssistant, replay, _replay_updates
+
+
+def _entry(command: str, text: str, **expected: Any) -> Dict[str, Any]:
+    """Build a corpus entry as written by the CorpusRecorder."""
+    return {
+        "command": command,
+        "lang": "en-US",
+        "text": "",
+        "html": f'<div class="show_text_content">{text}</div>',
+        "latency": 0.5,
+        "timestamp": 0,
+        "extracted": text,
+        **expected,
+    }
+
+
+class TestReplay(unittest.TestCase):
+    """Test cases for the replay of a recorded corpus."""
+
+    corpus: List[Dict[str, Any]]
+
+    def setUp(self) -> None:
+        self.corpus = [
+            _entry("status", "Mower is docked.", value="Dock"),
+            _entry("status", "Mower is running.", value="Run"),
+            _entry("battery", "Battery at 80 percent", value="80"),
+            dict(_entry("heater", "Heater is off"), extracted="Heater is on"),
+        ]
+
+    @patch("src.assistant.Credentials.from_authorized_user_file")
+    def test_replay_assistant_cycles_responses(self, mock_creds: MagicMock) -> None:
+        """Test that recorded responses are replayed in order, per command."""
+        assistant = ReplayAssistant(self.corpus)
+        mock_creds.assert_not_called()
+
+        self.assertEqual(assistant.call_assistant("status"), "Mower is docked.")
+        self.assertEqual(assistant.call_assistant("status"), "Mower is running.")
+        self.assertEqual(assistant.call_assistant("status"), "Mower is docked.")
+        with self.assertRaises(RuntimeError):
+            assistant.call_assistant("unknown")
+
+    def test_replay_report(self) -> None:
+        """Test the correctness and throughput report."""
+        mqtt_config: Dict[str, Any] = {
+            "publish": {
+                "status": {
+                    "command": "status",
+                    "regex": "Mower (is docked)",
+                    "result_map": {"is docked": "Dock"},
+                },
+                "battery": {"command": "battery", "regex": "([0-9]+) *percent"},
+                "light": {"command": "light"},
+            }
+        }
+
+        report = replay(self.corpus, mqtt_config, iterations=2)
+
+        self.assertEqual(report["entries"], 4)
+        extraction = report["extraction"]
+        self.assertEqual(extraction["checked"], 4)
+        self.assertEqual(extraction["matched"], 3)
+        self.assertEqual(
+            extraction["mismatches"],
+            [
+                {
+                    "command": "heater",
+                    "expected": "Heater is on",
+                    "actual": "Heater is off",
+                }
+            ],
+        )
+        self.assertGreater(extraction["responses_per_sec"], 0)
+
+        # The running status was recorded as "Run", the current regex misses it
+        status = report["update"]["keys"]["status"]
+        self.assertEqual(
+            (status["matched"], status["mismatched"], status["unchecked"]), (2, 2, 0)
+        )
+        self.assertEqual(
+            status["mismatches"][0],
+            {
+                "command": "status",
+                "expected": "Run",
+                "actual": "No valid response found.",
+            },
+        )
+        battery = report["update"]["keys"]["battery"]
+        self.assertEqual(
+            (battery["matched"], battery["mismatched"], battery["unchecked"]), (4, 0, 0)
+        )
+        self.assertEqual(report["update"]["skipped_keys"], ["light"])
+        self.assertGreater(report["update"]["responses_per_sec"], 0)
+
+    def test_replay_beyond_daily_quota(self) -> None:
+        """Test that the replay is not limited by the daily call quota."""
+        mqtt_config: Dict[str, Any] = {
+            "publish": {"battery": {"command": "battery", "regex": "([0-9]+) *percent"}}
+        }
+
+        assistant = ReplayAssistant(self.corpus[2:3])
+
+        report = _replay_updates(assistant, mqtt_config, iterations=500)
+
+        self.assertEqual(assistant.get_stats()["en-US"]["calls"], 500)
+        self.assertEqual(report["keys"]["battery"]["matched"], 500)
+
+    @patch("src.data.time.time")
+    def test_replay_ignores_scheduling(self, mock_time: MagicMock) -> None:
+        """Test that rules and active windows do not skip keys in the replay."""
+        # Monday 2024-01-01 12:00 UTC
+        mock_time.return_value = 1704110400.0
+        mqtt_config: Dict[str, Any] = {
+            "publish": {
+                "status": {
+                    "command": "status",
+                    "regex": "Mower is (docked|running)",
+                    "result_map": {"docked": "Dock", "running": "Run"},
+                    "rules": {"Dock": {"disable": ["battery"]}},
+                },
+                "battery": {
+                    "command": "battery",
+                    "regex": "([0-9]+) *percent",
+                    "active": ["sat,sun 08:00-20:00"],
+                    "timezone": "UTC",
+                },
+            }
+        }
+        assistant = ReplayAssistant(self.corpus)
+
+        report = _replay_updates(assistant, mqtt_config, iterations=1)
+
+        self.assertEqual(assistant.get_stats()["en-US"]["calls"], 4)
+        self.assertEqual(report["keys"]["status"]["matched"], 2)
+        self.assertEqual(report["keys"]["battery"]["matched"], 2)
+        self.assertIn("rules", mqtt_config["publish"]["status"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""Unit tests for the Schedule class and active windows."""
+
+import unittest
+
+from parameterized import parameterized  # type: ignore  # pylint: disable=import-error
+
+from src.schedule import Schedule, next_active
+
+# Monday, 2025-07-21 00:00 UTC
+MONDAY = 1753056000.0
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+class TestSchedule(unittest.TestCase):
+    """Test cases for the Schedule class."""
+
+    @parameterized.expand(
+        [
+            ("weekday_inside", ["mon-fri 08:00-20:00"], MONDAY + 8 * HOUR, True),
+            ("weekday_end", ["mon-fri 08:00-20:00"], MONDAY + 20 * HOUR, False),
+            ("weekend", ["mon-fri 08:00-20:00"], MONDAY + 5 * DAY + 9 * HOUR, False),
+            ("every_day", ["08:00-20:00"], MONDAY + 6 * DAY + 9 * HOUR, True),
+            (
+                "overnight_start",
+                ["fri 22:00-06:00"],
+                MONDAY + 4 * DAY + 23 * HOUR,
+                True,
+            ),
+            ("overnight_end", ["fri 22:00-06:00"], MONDAY + 5 * DAY + 5 * HOUR, True),
+            ("overnight_other_day", ["fri 22:00-06:00"], MONDAY + 5 * HOUR, False),
+            ("wrapping_days", ["sat-mon 10:00-11:00"], MONDAY + 10 * HOUR, True),
+            ("list_of_days", ["tue,thu 10:00-11:00"], MONDAY + 10 * HOUR, False),
+        ]
+    )
+    def test_is_active(
+        self, _name: str, windows: list, timestamp: float, expected: bool
+    ) -> None:
+        """Test the is_active method."""
+        self.assertEqual(Schedule(windows, "UTC").is_active(timestamp), expected)
+
+    def test_next_active(self) -> None:
+        """Test the next_active method."""
+        schedule = Schedule(["mon-fri 08:00-20:00", "sat 10:00-12:00"], "UTC")
+
+        self.assertEqual(schedule.next_active(MONDAY + 9 * HOUR), MONDAY + 9 * HOUR)
+        self.assertEqual(
+            schedule.next_active(MONDAY + 21 * HOUR), MONDAY + DAY + 8 * HOUR
+        )
+        self.assertEqual(
+            schedule.next_active(MONDAY + 4 * DAY + 20 * HOUR),
+            MONDAY + 5 * DAY + 10 * HOUR,
+        )
+        self.assertEqual(
+            schedule.next_active(MONDAY + 5 * DAY + 12 * HOUR),
+            MONDAY + 7 * DAY + 8 * HOUR,
+        )
+
+    def test_timezone(self) -> None:
+        """Test that windows are evaluated in their timezone."""
+        schedule = Schedule(["08:00-20:00"], "Europe/Berlin")
+
+        # 07:00 UTC is 09:00 in Berlin during summer time
+        self.assertTrue(schedule.is_active(MONDAY + 7 * HOUR))
+        self.assertFalse(schedule.is_active(MONDAY + 18 * HOUR))
+        self.assertEqual(
+            schedule.next_active(MONDAY + 19 * HOUR), MONDAY + DAY + 6 * HOUR
+        )
+
+    def test_next_active_of_several_schedules(self) -> None:
+        """Test the common next active timestamp of several schedules."""
+        key = Schedule(["mon-fri 08:00-20:00"], "UTC")
+        pause = Schedule(["00:00-06:00", "10:00-24:00"], "UTC")
+
+        self.assertEqual(
+            next_active([key, None, pause], MONDAY + 7 * HOUR), MONDAY + 10 * HOUR
+        )
+        self.assertEqual(next_active([None], MONDAY), MONDAY)
+        with self.assertRaises(ValueError):
+            next_active(
+                [key, Schedule(["sat,sun 00:00-24:00"], "UTC")], MONDAY + 9 * HOUR
+            )
+
+    def test_from_pause_hours(self) -> None:
+        """Test the schedule created from the request pause hours."""
+        self.assertIsNone(Schedule.from_pause_hours([]))
+        schedule = Schedule.from_pause_hours(range(0, 8))
+        assert schedule is not None
+        self.assertEqual(len(schedule.windows), 16)
+        self.assertEqual(schedule.windows[0].start, 8 * 60)
+
+        # Pausing all hours is never active
+        schedule = Schedule.from_pause_hours(range(24))
+        assert schedule is not None
+        self.assertFalse(schedule.is_active(MONDAY))
+        with self.assertRaises(ValueError):
+            schedule.next_active(MONDAY)
+
+    @parameterized.expand(
+        [
+            ("empty", []),
+            ("days", ["someday 08:00-09:00"]),
+            ("time", ["8-"]),
+            ("minutes", ["08:75-09:00"]),
+            ("after_midnight", ["23:00-24:30"]),
+        ]
+    )
+    def test_invalid_windows(self, _name: str, windows: list) -> None:
+        """Test that invalid windows are rejected."""
+        with self.assertRaises(ValueError):
+            Schedule(windows)
+
+
+if __name__ == "__main__":
+    unittest.main()
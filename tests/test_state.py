@@ -0,0 +1,106 @@
+"""Unit tests for the DeviceState and KeyState classes."""
+
+import json
+import threading
+import unittest
+from unittest.mock import call, patch, MagicMock
+
+from src.state import DeviceState, format_date
+
+
+class TestDeviceState(unittest.TestCase):
+    """Test cases for the DeviceState class."""
+
+    def test_set_value_versions(self) -> None:
+        """Test that the version only changes when a value changes."""
+        state = DeviceState()
+
+        state.set_value("key1", "Run", 100)
+        state.set_value("key1", "Run", 200)
+        self.assertEqual(state.version, 1)
+        self.assertEqual(state.key("key1").version, 1)
+        self.assertEqual(state.key("key1").timestamp, 200)
+
+        state.set_value("key1", "Dock", 300)
+        state.set_value("key2", 1, 300)
+        state.set_value("key2", True, 300)
+        self.assertEqual(state.version, 4)
+        self.assertEqual(state.key("key1").version, 2)
+        self.assertIsNone(state.get_value("unknown"))
+
+    def test_to_json(self) -> None:
+        """Test that the payload matches a plain JSON serialization."""
+        state = DeviceState()
+        state.sdk_calls_today = 3
+        state.error = ""
+        state.timestamp = 1672531200
+        state.set_value("key1", "Run", 1672531200)
+        state.set_value("key2", 80, 1672531200)
+
+        payload = state.to_json(["key1", "key2", "key3"])
+
+        self.assertEqual(
+            payload,
+            json.dumps(
+                {
+                    "sdk_calls_today": 3,
+                    "error": "",
+                    "timestamp": format_date(1672531200),
+                    "key1": "Run",
+                    "key2": 80,
+                    "key3": None,
+                }
+            ),
+        )
+        self.assertEqual(
+            json.loads(DeviceState().to_json([])),
+            {"sdk_calls_today": 0, "error": None, "timestamp": None},
+        )
+
+    @patch("src.state.json.dumps", wraps=json.dumps)
+    def test_to_json_regenerates_changed_fragments_only(
+        self, mock_dumps: MagicMock
+    ) -> None:
+        """Test that only fragments of changed keys are serialized again."""
+        state = DeviceState()
+        state.set_value("key1", "Run", 100)
+        state.set_value("key2", "80", 100)
+        state.to_json(["key1", "key2"])
+
+        # Nothing changed: everything is served from the cache
+        mock_dumps.reset_mock()
+        state.to_json(["key1", "key2"])
+        mock_dumps.assert_not_called()
+
+        # Only the changed key and the header are serialized again
+        state.set_value("key2", "75", 200)
+        state.timestamp = 200
+        payload = state.to_json(["key1", "key2"])
+        mock_dumps.assert_any_call("75")
+        self.assertNotIn(call("Run"), mock_dumps.call_args_list)
+        self.assertEqual(json.loads(payload)["key2"], "75")
+
+    def test_concurrent_updates(self) -> None:
+        """Test that serializing from another thread never keeps stale values."""
+        state = DeviceState()
+        done = threading.Event()
+
+        def publish() -> None:
+            while not done.is_set():
+                state.to_json(["key1"])
+
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        for value in range(2000):
+            state.set_value("key1", value, 1672531200)
+            state.set_call_count(value, "2023-01-01")
+        done.set()
+        publisher.join()
+
+        payload = json.loads(state.to_json(["key1"]))
+        self.assertEqual(payload["key1"], 1999)
+        self.assertEqual(payload["sdk_calls_today"], 1999)
+
+
+if __name__ == "__main__":
+    unittest.main()